@@ -8,9 +8,28 @@ import PieChart from './Charts/PieChart';
 
 const API_BASE_URL = "https://employee-survey-platform.onrender.com";
 
+// Distribution items ([{ label, value }]) -> chart state
+const toChartData = (items) => ({
+  labels: items.map(item => item.label),
+  data: items.map(item => item.value),
+});
+
+// Add a pushed { label: change } delta to chart state, dropping labels that reach zero
+const applyDelta = (chartData, changes = {}) => {
+  const counts = {};
+  chartData.labels.forEach((label, i) => { counts[label] = chartData.data[i]; });
+  Object.entries(changes).forEach(([label, change]) => {
+    counts[label] = (counts[label] || 0) + change;
+  });
+  const labels = Object.keys(counts).filter(label => counts[label] > 0);
+  return { labels, data: labels.map(label => counts[label]) };
+};
+
 const AnalysisDashboard = ({ surveyId }) => {
   const [sentimentData, setSentimentData] = useState({ labels: [], data: [] });
   const [burnoutRiskData, setBurnoutRiskData] = useState({ labels: [], data: [] });
+  const [responsesOverTime, setResponsesOverTime] = useState({ labels: [], data: [] });
+  const [positiveShareOverTime, setPositiveShareOverTime] = useState({ labels: [], data: [] });
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
 
@@ -30,22 +49,24 @@ const AnalysisDashboard = ({ surveyId }) => {
           { headers }
         );
 
-        // Process sentiment distribution for Pie/Bar chart
-        const sentimentLabels = distributionRes.data.sentiment_distribution.map(item => item.label);
-        const sentimentValues = distributionRes.data.sentiment_distribution.map(item => item.value);
-        setSentimentData({ labels: sentimentLabels, data: sentimentValues });
+        // Process sentiment and burnout risk distributions for Pie/Bar charts
+        setSentimentData(toChartData(distributionRes.data.sentiment_distribution));
+        setBurnoutRiskData(toChartData(distributionRes.data.burnout_risk_distribution));
 
-        // Process burnout risk distribution for Pie/Bar chart
-        const burnoutLabels = distributionRes.data.burnout_risk_distribution.map(item => item.label);
-        const burnoutValues = distributionRes.data.burnout_risk_distribution.map(item => item.value);
-        setBurnoutRiskData({ labels: burnoutLabels, data: burnoutValues });
-
-        // --- You would fetch data for other charts/tables here similarly ---
-        // For example, if you had a Line Chart for responses over time, you'd have another endpoint
-        // For demonstration, let's create dummy data for Line/Area charts.
-        const dummyLineLabels = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun'];
-        const dummyLineData = [65, 59, 80, 81, 56, 55];
-        // For a real scenario, this would come from an endpoint providing time-series data.
+        // Daily sentiment counts, served from pre-bucketed rollups
+        const trendRes = await axios.get(
+          `${API_BASE_URL}/analysis/survey/${surveyId}/trend`,
+          { headers, params: { granularity: 'day', dimension: 'sentiment' } }
+        );
+        const buckets = trendRes.data.buckets;
+        const dayLabels = buckets.map(bucket => bucket.bucket.slice(0, 10));
+        setResponsesOverTime({ labels: dayLabels, data: buckets.map(bucket => bucket.total) });
+        setPositiveShareOverTime({
+          labels: dayLabels,
+          data: buckets.map(bucket =>
+            bucket.total ? Math.round(((bucket.counts.Positive || 0) / bucket.total) * 100) : 0
+          ),
+        });
 
       } catch (err) {
         console.error("Error fetching analysis data:", err);
@@ -60,6 +81,26 @@ const AnalysisDashboard = ({ surveyId }) => {
     }
   }, [surveyId]);
 
+  // Live updates: the server pushes a snapshot on connect, then per-response deltas
+  useEffect(() => {
+    if (!surveyId || typeof EventSource === 'undefined') return undefined;
+    const token = localStorage.getItem('userToken');
+    const source = new EventSource(
+      `${API_BASE_URL}/analysis/survey/${surveyId}/events?access_token=${encodeURIComponent(token)}`
+    );
+    source.addEventListener('snapshot', (event) => {
+      const snapshot = JSON.parse(event.data);
+      setSentimentData(toChartData(snapshot.sentiment_distribution));
+      setBurnoutRiskData(toChartData(snapshot.burnout_risk_distribution));
+    });
+    source.addEventListener('delta', (event) => {
+      const delta = JSON.parse(event.data);
+      setSentimentData(prev => applyDelta(prev, delta.sentiment));
+      setBurnoutRiskData(prev => applyDelta(prev, delta.burnout_risk));
+    });
+    return () => source.close();
+  }, [surveyId]);
+
   if (loading) return <div>Loading charts...</div>;
   if (error) return <div style={{ color: 'red' }}>Error: {error}</div>;
 
@@ -103,21 +144,20 @@ const AnalysisDashboard = ({ surveyId }) => {
             backgroundColor={getBackgroundColor(burnoutRiskData.labels, burnoutColors)}
           />
         </div>
-        {/* Placeholder for Line and Area charts - you'd fetch real data for these */}
         <div style={{ border: '1px solid #ccc', padding: '15px', borderRadius: '8px' }}>
           <LineChart
-            title="Responses Over Time (Example)"
-            labels={['Week 1', 'Week 2', 'Week 3', 'Week 4']}
-            data={[10, 15, 7, 20]}
+            title="Responses Per Day"
+            labels={responsesOverTime.labels}
+            data={responsesOverTime.data}
             borderColor="rgb(54, 162, 235)"
             backgroundColor="rgba(54, 162, 235, 0.2)"
           />
         </div>
         <div style={{ border: '1px solid #ccc', padding: '15px', borderRadius: '8px' }}>
           <AreaChart
-            title="Employee Engagement Trend (Example)"
-            labels={['Q1', 'Q2', 'Q3', 'Q4']}
-            data={[80, 85, 78, 90]}
+            title="Positive Sentiment Share (%)"
+            labels={positiveShareOverTime.labels}
+            data={positiveShareOverTime.data}
             borderColor="rgb(255, 99, 132)"
             backgroundColor="rgba(255, 99, 132, 0.2)"
           />
@@ -0,0 +1,203 @@
+from collections import Counter
+from sqlalchemy import func, update, delete
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from models import SurveyAggregate, SurveyResponse, SurveyRollup
+from data_versions import bump_survey_versions
+
+UNKNOWN_LABEL = "Unknown"
+DIMENSIONS = ("sentiment", "burnout_risk")
+GRANULARITIES = ("hour", "day")
+
+
+def increment_counters(db, model, key_columns: tuple, rows: list) -> None:
+    """
+    Add each row's `count` to the matching counter row of `model` with one upsert.
+    `key_columns` must be covered by a unique constraint.
+    """
+    if not rows:
+        return
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        insert = sqlite_insert if dialect == "sqlite" else postgresql_insert
+        stmt = insert(model)
+        db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=list(key_columns),
+                set_={"count": model.count + stmt.excluded.count},
+            ),
+            rows,
+        )
+        return
+
+    for row in rows:
+        updated = db.execute(
+            update(model)
+            .where(*(getattr(model, column) == row[column] for column in key_columns))
+            .values(count=model.count + row["count"])
+        ).rowcount
+        if not updated:
+            db.add(model(**row))
+            db.flush()
+
+
+def _increment(db, survey_id: int, dimension: str, label: str, delta: int) -> None:
+    increment_counters(
+        db, SurveyAggregate, ("survey_id", "dimension", "label"),
+        [{"survey_id": survey_id, "dimension": dimension, "label": label, "count": delta}],
+    )
+
+
+def bucket_start(submitted_at, granularity: str):
+    if granularity == "hour":
+        return submitted_at.replace(minute=0, second=0, microsecond=0)
+    return submitted_at.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _rollup_rows(survey_id: int, submitted_at, dimension: str, label: str, delta: int) -> list:
+    return [
+        {"survey_id": survey_id, "granularity": granularity, "bucket_start": bucket_start(submitted_at, granularity),
+         "dimension": dimension, "label": label, "count": delta}
+        for granularity in GRANULARITIES
+    ]
+
+
+def _increment_rollups(db, rows: list) -> None:
+    increment_counters(db, SurveyRollup, ("survey_id", "granularity", "bucket_start", "dimension", "label"), rows)
+
+
+def record_response(db, survey_id: int, sentiment=None, burnout_risk=None, submitted_at=None) -> None:
+    """Count a newly stored response; call inside the transaction that inserts it."""
+    _increment(db, survey_id, "sentiment", sentiment or UNKNOWN_LABEL, 1)
+    _increment(db, survey_id, "burnout_risk", burnout_risk or UNKNOWN_LABEL, 1)
+    if submitted_at is not None:
+        _increment_rollups(
+            db,
+            _rollup_rows(survey_id, submitted_at, "sentiment", sentiment or UNKNOWN_LABEL, 1)
+            + _rollup_rows(survey_id, submitted_at, "burnout_risk", burnout_risk or UNKNOWN_LABEL, 1),
+        )
+
+
+def relabel_response(db, survey_id: int, old_sentiment, old_burnout_risk, new_sentiment, new_burnout_risk,
+                     submitted_at=None) -> None:
+    """Move a response's counts (and its time buckets) from its old labels to its new ones in the caller's transaction."""
+    changes = (
+        ("sentiment", old_sentiment or UNKNOWN_LABEL, new_sentiment or UNKNOWN_LABEL),
+        ("burnout_risk", old_burnout_risk or UNKNOWN_LABEL, new_burnout_risk or UNKNOWN_LABEL),
+    )
+    rollup_rows = []
+    for dimension, old_label, new_label in changes:
+        if old_label == new_label:
+            continue
+        _increment(db, survey_id, dimension, old_label, -1)
+        _increment(db, survey_id, dimension, new_label, 1)
+        if submitted_at is not None:
+            rollup_rows += _rollup_rows(survey_id, submitted_at, dimension, old_label, -1)
+            rollup_rows += _rollup_rows(survey_id, submitted_at, dimension, new_label, 1)
+    _increment_rollups(db, rollup_rows)
+
+
+def get_distribution(db, survey_id: int) -> dict:
+    rows = db.query(SurveyAggregate.dimension, SurveyAggregate.label, SurveyAggregate.count).filter(
+        SurveyAggregate.survey_id == survey_id,
+        SurveyAggregate.count > 0,
+    ).all()
+    distribution = {dimension: [] for dimension in DIMENSIONS}
+    for dimension, label, count in rows:
+        distribution.setdefault(dimension, []).append({"label": label, "value": count})
+    return distribution
+
+
+def get_trend(db, survey_id: int, granularity: str = "day", dimension: str = "sentiment",
+              start=None, end=None) -> list:
+    """Per-bucket label counts from the rollups only: [{"bucket", "total", "counts": {label: n}}]."""
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+    if dimension not in DIMENSIONS:
+        raise ValueError(f"dimension must be one of {', '.join(DIMENSIONS)}")
+    query = db.query(SurveyRollup.bucket_start, SurveyRollup.label, SurveyRollup.count).filter(
+        SurveyRollup.survey_id == survey_id,
+        SurveyRollup.granularity == granularity,
+        SurveyRollup.dimension == dimension,
+        SurveyRollup.count > 0,
+    )
+    if start is not None:
+        query = query.filter(SurveyRollup.bucket_start >= bucket_start(start, granularity))
+    if end is not None:
+        query = query.filter(SurveyRollup.bucket_start <= end)
+    buckets = {}
+    for row_bucket, label, count in query.order_by(SurveyRollup.bucket_start):
+        bucket = buckets.setdefault(row_bucket, {"bucket": row_bucket, "total": 0, "counts": {}})
+        bucket["counts"][label] = count
+        bucket["total"] += count
+    return list(buckets.values())
+
+
+def rebuild_rollups(db, survey_id: int = None, chunk_size: int = 5000) -> int:
+    """Recompute the time-bucket counters from timestamped responses. Returns the number of rows written."""
+    clear = delete(SurveyRollup)
+    if survey_id is not None:
+        clear = clear.where(SurveyRollup.survey_id == survey_id)
+    db.execute(clear)
+
+    counts = Counter()
+    last_id = 0
+    while True:
+        query = db.query(
+            SurveyResponse.id, SurveyResponse.survey_id, SurveyResponse.submitted_at,
+            SurveyResponse.sentiment, SurveyResponse.burnout_risk,
+        ).filter(SurveyResponse.id > last_id, SurveyResponse.submitted_at.isnot(None))
+        if survey_id is not None:
+            query = query.filter(SurveyResponse.survey_id == survey_id)
+        rows = query.order_by(SurveyResponse.id).limit(chunk_size).all()
+        if not rows:
+            break
+        for _, row_survey_id, submitted_at, sentiment, burnout_risk in rows:
+            for granularity in GRANULARITIES:
+                start = bucket_start(submitted_at, granularity)
+                counts[(row_survey_id, granularity, start, "sentiment", sentiment or UNKNOWN_LABEL)] += 1
+                counts[(row_survey_id, granularity, start, "burnout_risk", burnout_risk or UNKNOWN_LABEL)] += 1
+        last_id = rows[-1].id
+
+    _increment_rollups(db, [
+        {"survey_id": row_survey_id, "granularity": granularity, "bucket_start": start,
+         "dimension": dimension, "label": label, "count": count}
+        for (row_survey_id, granularity, start, dimension, label), count in counts.items()
+    ])
+    return len(counts)
+
+
+def rebuild_aggregates(db, survey_id: int = None) -> int:
+    """Recompute counters from survey_responses to repair drift. Returns the number of rows written."""
+    clear = delete(SurveyAggregate)
+    if survey_id is not None:
+        clear = clear.where(SurveyAggregate.survey_id == survey_id)
+    db.execute(clear)
+
+    written = 0
+    for dimension in DIMENSIONS:
+        column = getattr(SurveyResponse, dimension)
+        label = func.coalesce(column, UNKNOWN_LABEL)
+        query = db.query(SurveyResponse.survey_id, label, func.count(SurveyResponse.id)).group_by(
+            SurveyResponse.survey_id, label
+        )
+        if survey_id is not None:
+            query = query.filter(SurveyResponse.survey_id == survey_id)
+        for row_survey_id, row_label, count in query:
+            db.add(SurveyAggregate(survey_id=row_survey_id, dimension=dimension, label=row_label, count=count))
+            written += 1
+    written += rebuild_rollups(db, survey_id=survey_id)
+    bump_survey_versions(db, None if survey_id is None else [survey_id])
+    db.commit()
+    return written
+
+
+def ensure_aggregates(db) -> None:
+    """Build the counters once for databases that predate the survey_aggregates or survey_rollups tables."""
+    if db.query(SurveyAggregate.id).first() is None and db.query(SurveyResponse.id).first() is not None:
+        rebuild_aggregates(db)
+        return
+    timestamped = db.query(SurveyResponse.id).filter(SurveyResponse.submitted_at.isnot(None)).first()
+    if db.query(SurveyRollup.id).first() is None and timestamped is not None:
+        rebuild_rollups(db)
+        db.commit()
@@ -0,0 +1,145 @@
+"""
+Resumable, rate-limited re-analysis of responses with 'fallback', 'failed' or NULL analysis_status.
+The checkpoint cursor is committed together with each result.
+"""
+import os
+import asyncio
+from collections import deque
+from sqlalchemy import or_, exists
+from database import AsyncSessionLocal
+from models import AnalysisJob, JobCheckpoint, SurveyResponse
+from data_versions import bump_survey_versions
+from analysis_worker import apply_analysis
+from serialization import parse_answers
+from perplexityai_analysis import (
+    build_feedback_text, analysis_without_llm, llm_analysis_async, is_fallback,
+)
+
+# ==============================
+# CONFIGURATION
+# ==============================
+BACKFILL_CONCURRENCY = int(os.getenv("BACKFILL_CONCURRENCY", "4"))
+BACKFILL_RPM = int(os.getenv("BACKFILL_RPM", "60"))  # provider requests, chunks and retries included
+BACKFILL_WINDOW = 100  # rows read per query
+BACKFILL_STATUSES = ("fallback", "failed")
+
+
+class RateLimiter:
+    """Spaces acquisitions evenly so at most `per_minute` start in any minute."""
+
+    def __init__(self, per_minute: int):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            now = loop.time()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+def checkpoint_name(survey_id: int = None) -> str:
+    return "analysis_backfill" if survey_id is None else f"analysis_backfill:{survey_id}"
+
+
+def load_checkpoint(db, name: str) -> int:
+    checkpoint = db.query(JobCheckpoint).filter(JobCheckpoint.name == name).first()
+    return checkpoint.cursor if checkpoint else 0
+
+
+def save_checkpoint(db, name: str, cursor: int) -> None:
+    """Set the cursor in the caller's transaction."""
+    checkpoint = db.query(JobCheckpoint).filter(JobCheckpoint.name == name).first()
+    if checkpoint is None:
+        db.add(JobCheckpoint(name=name, cursor=cursor))
+    else:
+        checkpoint.cursor = cursor
+
+
+def clear_checkpoint(db, name: str) -> None:
+    db.query(JobCheckpoint).filter(JobCheckpoint.name == name).delete()
+    db.commit()
+
+
+def backfill_candidates(db, after_id: int, survey_id: int = None, limit: int = BACKFILL_WINDOW) -> list:
+    """(id, answers) of the next rows to re-analyze."""
+    queued = exists().where(
+        AnalysisJob.response_id == SurveyResponse.id, AnalysisJob.status.in_(("pending", "running"))
+    )
+    query = db.query(SurveyResponse.id, SurveyResponse.answers).filter(
+        SurveyResponse.id > after_id,
+        or_(SurveyResponse.analysis_status.in_(BACKFILL_STATUSES), SurveyResponse.analysis_status.is_(None)),
+        ~queued,
+    )
+    if survey_id is not None:
+        query = query.filter(SurveyResponse.survey_id == survey_id)
+    return query.order_by(SurveyResponse.id).limit(limit).all()
+
+
+def store_backfill_result(db, response_id: int, result: dict, name: str, cursor: int) -> None:
+    """Apply one result and move the cursor in one transaction."""
+    response = db.get(SurveyResponse, response_id)
+    if response is not None:
+        deltas = {}
+        apply_analysis(db, response, result, deltas)
+        if not is_fallback(result):
+            db.query(AnalysisJob).filter(
+                AnalysisJob.response_id == response_id, AnalysisJob.status == "failed"
+            ).update({"status": "done", "last_error": None}, synchronize_session=False)
+        bump_survey_versions(db, deltas.keys())
+    save_checkpoint(db, name, cursor)
+    db.commit()
+
+
+async def run_analysis_backfill(survey_id: int = None, concurrency: int = None, rpm: int = None,
+                                restart: bool = False, session_factory=AsyncSessionLocal) -> dict:
+    """Re-analyze fallback, failed and unverified responses. Returns counts for the run."""
+    name = checkpoint_name(survey_id)
+    semaphore = asyncio.Semaphore(concurrency or BACKFILL_CONCURRENCY)
+    limiter = RateLimiter(rpm or BACKFILL_RPM)
+    write_lock = asyncio.Lock()
+    stats = {"scanned": 0, "analyzed": 0, "fallback": 0, "llm_calls": 0, "llm_requests": 0}
+
+    async def before_request() -> None:
+        stats["llm_requests"] += 1
+        await limiter.acquire()
+
+    async with session_factory() as db:
+        if restart:
+            await db.run_sync(clear_checkpoint, name)
+        cursor = await db.run_sync(load_checkpoint, name)
+        stats["resumed_from"] = cursor
+
+        while True:
+            rows = await db.run_sync(backfill_candidates, cursor, survey_id)
+            if not rows:
+                break
+            in_order = deque(row.id for row in rows)
+            finished = set()
+
+            async def handle(response_id: int, answers: str) -> None:
+                nonlocal cursor
+                responses = parse_answers(answers)
+                text_feedback = build_feedback_text(responses)
+                result = await asyncio.to_thread(analysis_without_llm, response_id, responses, text_feedback)
+                if result is None:
+                    async with semaphore:
+                        stats["llm_calls"] += 1
+                        result = await llm_analysis_async(response_id, text_feedback, before_request)
+                async with write_lock:
+                    finished.add(response_id)
+                    while in_order and in_order[0] in finished:
+                        cursor = in_order.popleft()
+                    await db.run_sync(store_backfill_result, response_id, result, name, cursor)
+                stats["fallback" if is_fallback(result) else "analyzed"] += 1
+
+            await asyncio.gather(*(handle(row.id, row.answers) for row in rows))
+            stats["scanned"] += len(rows)
+            print(f"Backfill at response {cursor}: {stats['analyzed']} analyzed, {stats['fallback']} fell back")
+
+        await db.run_sync(clear_checkpoint, name)
+    return stats
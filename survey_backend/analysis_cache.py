@@ -0,0 +1,139 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+# ==============================
+# CONFIGURATION
+# ==============================
+ANALYSIS_CACHE_PATH = os.getenv("ANALYSIS_CACHE_PATH", "./analysis_cache.db")
+ANALYSIS_CACHE_TTL_SECONDS = int(os.getenv("ANALYSIS_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+ANALYSIS_CACHE_MEMORY_ITEMS = int(os.getenv("ANALYSIS_CACHE_MEMORY_ITEMS", "2048"))
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_feedback(text_feedback: str) -> str:
+    return _WHITESPACE.sub(" ", (text_feedback or "").strip().lower())
+
+
+def cache_key(text_feedback: str, model_version: str) -> str:
+    normalized = normalize_feedback(text_feedback)
+    return hashlib.sha256(f"{model_version}\n{normalized}".encode("utf-8")).hexdigest()
+
+
+class AnalysisCache:
+    """
+    LLM analyses by normalized feedback hash: an in-process LRU over a shared SQLite table.
+    Entries expire after `ttl` seconds and are scoped to the model version.
+    """
+
+    def __init__(self, path: str = ANALYSIS_CACHE_PATH, ttl: int = ANALYSIS_CACHE_TTL_SECONDS,
+                 memory_items: int = ANALYSIS_CACHE_MEMORY_ITEMS):
+        self.path = path
+        self.ttl = ttl
+        self.memory_items = memory_items
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "expired": 0}
+
+    def _connection(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS analysis_cache ("
+                " key TEXT PRIMARY KEY,"
+                " model_version TEXT NOT NULL,"
+                " analysis TEXT NOT NULL,"
+                " created_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def _remember(self, key: str, analysis: dict, created_at: float) -> None:
+        self._memory[key] = (analysis, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def get(self, text_feedback: str, model_version: str):
+        key = cache_key(text_feedback, model_version)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                analysis, created_at = entry
+                if now - created_at <= self.ttl:
+                    self._memory.move_to_end(key)
+                    self.counters["memory_hits"] += 1
+                    return analysis
+                del self._memory[key]
+                self.counters["expired"] += 1
+
+            try:
+                row = self._connection().execute(
+                    "SELECT analysis, created_at FROM analysis_cache WHERE key = ? AND model_version = ?",
+                    (key, model_version),
+                ).fetchone()
+            except sqlite3.Error as e:
+                print(f"Analysis cache read failed: {e}")
+                row = None
+
+            if row is not None and now - row[1] <= self.ttl:
+                analysis = json.loads(row[0])
+                self._remember(key, analysis, row[1])
+                self.counters["disk_hits"] += 1
+                return analysis
+            if row is not None:
+                self.counters["expired"] += 1
+            self.counters["misses"] += 1
+            return None
+
+    def set(self, text_feedback: str, model_version: str, analysis: dict) -> None:
+        key = cache_key(text_feedback, model_version)
+        now = time.time()
+        with self._lock:
+            self._remember(key, analysis, now)
+            try:
+                conn = self._connection()
+                conn.execute(
+                    "INSERT OR REPLACE INTO analysis_cache (key, model_version, analysis, created_at)"
+                    " VALUES (?, ?, ?, ?)",
+                    (key, model_version, json.dumps(analysis), now),
+                )
+                conn.commit()
+            except sqlite3.Error as e:
+                print(f"Analysis cache write failed: {e}")
+            self.counters["stores"] += 1
+
+    def purge_expired(self, current_model_version: str = None) -> int:
+        """Delete expired rows and, if given, rows written by any other model version."""
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            self._memory.clear()
+            conn = self._connection()
+            if current_model_version is None:
+                cursor = conn.execute("DELETE FROM analysis_cache WHERE created_at < ?", (cutoff,))
+            else:
+                cursor = conn.execute(
+                    "DELETE FROM analysis_cache WHERE created_at < ? OR model_version != ?",
+                    (cutoff, current_model_version),
+                )
+            conn.commit()
+            return cursor.rowcount
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.counters)
+            stats["memory_items"] = len(self._memory)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
+
+
+analysis_cache = AnalysisCache()
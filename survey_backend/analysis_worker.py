@@ -0,0 +1,246 @@
+import os
+import json
+import random
+import asyncio
+from datetime import datetime, timedelta
+from sqlalchemy import update, or_
+from database import AsyncSessionLocal
+from models import AnalysisJob, SurveyResponse
+from aggregates import relabel_response, UNKNOWN_LABEL
+from data_versions import bump_survey_versions
+from live_updates import broker, add_relabel
+from perplexityai_analysis import analyze_batch, analyze_batch_async, extract_labels, is_fallback, BATCH_SIZE
+
+# ==============================
+# CONFIGURATION
+# ==============================
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "4"))
+POLL_INTERVAL_SECONDS = 2.0
+MAX_ATTEMPTS = 3
+RETRY_BASE_SECONDS = 30.0  # delay before the 2nd attempt, doubled for each later one (with jitter)
+STALE_JOB_MINUTES = 10  # 'running' jobs older than this are assumed orphaned by a crash
+REQUEUE_INTERVAL_SECONDS = 60.0  # how often idle workers look for such jobs
+FALLBACK_ERROR = "AI analysis failed (fallback result)"
+
+
+def enqueue_analysis(db, response_id: int) -> AnalysisJob:
+    """Add a pending analysis job for a response; the caller commits."""
+    job = AnalysisJob(response_id=response_id, status="pending", attempts=0)
+    db.add(job)
+    return job
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Jittered exponential delay before the attempt after `attempts` failed ones."""
+    return timedelta(seconds=RETRY_BASE_SECONDS * 2 ** (attempts - 1) * random.uniform(0.5, 1.0))
+
+
+def requeue_stale_jobs(db) -> int:
+    """Put orphaned 'running' jobs back to pending, or fail them if they are out of attempts."""
+    now = datetime.utcnow()
+    stale = (AnalysisJob.status == "running", AnalysisJob.updated_at < now - timedelta(minutes=STALE_JOB_MINUTES))
+    exhausted = [
+        response_id for (response_id,) in
+        db.query(AnalysisJob.response_id).filter(*stale, AnalysisJob.attempts >= MAX_ATTEMPTS)
+    ]
+    if exhausted:
+        db.execute(
+            update(AnalysisJob)
+            .where(*stale, AnalysisJob.response_id.in_(exhausted))
+            .values(status="failed", last_error="Worker stopped while analyzing", updated_at=now)
+        )
+        db.execute(
+            update(SurveyResponse).where(SurveyResponse.id.in_(exhausted)).values(analysis_status="failed")
+        )
+    result = db.execute(
+        update(AnalysisJob)
+        .where(*stale, AnalysisJob.attempts < MAX_ATTEMPTS)
+        .values(status="pending", available_at=None, updated_at=now)
+    )
+    db.commit()
+    return result.rowcount + len(exhausted)
+
+
+def claim_jobs(db, limit: int = BATCH_SIZE) -> list:
+    """
+    Atomically move up to `limit` of the oldest pending jobs that are due to 'running'.
+    The conditional UPDATE makes each claim safe across threads and processes.
+    """
+    job_ids = [
+        job_id for (job_id,) in db.query(AnalysisJob.id)
+        .filter(
+            AnalysisJob.status == "pending",
+            or_(AnalysisJob.available_at.is_(None), AnalysisJob.available_at <= datetime.utcnow()),
+        )
+        .order_by(AnalysisJob.id)
+        .limit(limit)
+    ]
+    claimed = []
+    for job_id in job_ids:
+        rowcount = db.execute(
+            update(AnalysisJob)
+            .where(AnalysisJob.id == job_id, AnalysisJob.status == "pending")
+            .values(status="running", attempts=AnalysisJob.attempts + 1, updated_at=datetime.utcnow())
+        ).rowcount
+        if rowcount:
+            claimed.append(job_id)
+    db.commit()
+    if not claimed:
+        return []
+    return db.query(AnalysisJob).filter(AnalysisJob.id.in_(claimed)).order_by(AnalysisJob.id).all()
+
+
+def load_submissions(db, jobs: list) -> tuple:
+    """Return ({response_id: response}, {response_id: answers}); jobs whose response is gone are failed."""
+    responses = {
+        r.id: r for r in db.query(SurveyResponse).filter(
+            SurveyResponse.id.in_([job.response_id for job in jobs])
+        )
+    }
+    submissions = {}
+    for job in jobs:
+        response = responses.get(job.response_id)
+        if response is None:
+            job.status = "failed"
+            job.last_error = "Response no longer exists"
+            continue
+        try:
+            submissions[response.id] = json.loads(response.answers or "{}")
+        except json.JSONDecodeError:
+            submissions[response.id] = {}
+    return responses, submissions
+
+
+def apply_analysis(db, response, result: dict, deltas: dict) -> None:
+    """Write one analysis result to its response, its counters and `deltas`; the caller commits."""
+    sentiment, burnout_risk = extract_labels(result)
+    relabel_response(db, response.survey_id, response.sentiment, response.burnout_risk,
+                     sentiment, burnout_risk, submitted_at=response.submitted_at)
+    add_relabel(
+        deltas, response.survey_id,
+        (response.sentiment or UNKNOWN_LABEL, response.burnout_risk or UNKNOWN_LABEL),
+        (sentiment or UNKNOWN_LABEL, burnout_risk or UNKNOWN_LABEL),
+    )
+    response.sentiment, response.burnout_risk = sentiment, burnout_risk
+    response.analysis_status = "fallback" if is_fallback(result) else "analyzed"
+
+
+def store_results(db, jobs: list, responses: dict, results: dict, error: str) -> dict:
+    """
+    Apply results and commit; a missing or fallback result is retried until the last attempt.
+    Returns {survey_id: distribution delta} for live dashboards.
+    """
+    deltas = {}
+    for job in jobs:
+        if job.status == "failed":
+            continue
+        result = results.get(job.response_id)
+        if result is not None and not is_fallback(result):
+            apply_analysis(db, responses[job.response_id], result, deltas)
+            job.status = "done"
+            job.last_error = None
+            continue
+        job.last_error = error if result is None else FALLBACK_ERROR
+        if job.attempts < MAX_ATTEMPTS:
+            job.status = "pending"
+            job.available_at = datetime.utcnow() + retry_delay(job.attempts)
+        elif result is not None:
+            apply_analysis(db, responses[job.response_id], result, deltas)
+            job.status = "failed"
+        else:
+            job.status = "failed"
+            responses[job.response_id].analysis_status = "failed"
+    bump_survey_versions(db, deltas.keys())
+    db.commit()
+    return deltas
+
+
+def process_jobs(db, jobs: list) -> None:
+    """Synchronous job processing, for scripts that run outside the event loop."""
+    responses, submissions = load_submissions(db, jobs)
+    error = "No analysis result returned"
+    try:
+        results = analyze_batch(submissions) if submissions else {}
+    except Exception as e:
+        results, error = {}, str(e)
+    store_results(db, jobs, responses, results, error)
+
+
+async def process_jobs_async(db, jobs: list) -> None:
+    responses, submissions = await db.run_sync(load_submissions, jobs)
+    error = "No analysis result returned"
+    try:
+        results = await analyze_batch_async(submissions) if submissions else {}
+    except Exception as e:
+        results, error = {}, str(e)
+    deltas = await db.run_sync(store_results, jobs, responses, results, error)
+    try:
+        await broker.publish(deltas.values())
+    except Exception as e:
+        print(f"Live update publish failed: {e}")
+
+
+class AnalysisWorkerPool:
+    """Asyncio tasks that drain analysis_jobs; notify() wakes them, otherwise they poll."""
+
+    def __init__(self, workers: int = ANALYSIS_WORKERS, session_factory=AsyncSessionLocal):
+        self.workers = workers
+        self.session_factory = session_factory
+        self._wakeup = None
+        self._stopping = None
+        self._tasks = []
+        self._last_requeue = 0.0
+
+    async def start(self) -> None:
+        # Events are created here so they belong to the running loop
+        self._wakeup = asyncio.Event()
+        self._stopping = asyncio.Event()
+        await self._requeue_stale()
+        self._tasks = [
+            asyncio.create_task(self._run(), name=f"analysis-worker-{i}") for i in range(self.workers)
+        ]
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        if self._stopping is None:
+            return
+        self._stopping.set()
+        self._wakeup.set()
+        if self._tasks:
+            _, still_running = await asyncio.wait(self._tasks, timeout=timeout)
+            for task in still_running:
+                task.cancel()
+        self._tasks = []
+
+    async def _requeue_stale(self) -> None:
+        self._last_requeue = asyncio.get_running_loop().time()
+        async with self.session_factory() as db:
+            await db.run_sync(requeue_stale_jobs)
+
+    def notify(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                async with self.session_factory() as db:
+                    jobs = await db.run_sync(claim_jobs)
+                    if jobs:
+                        await process_jobs_async(db, jobs)
+                        continue
+            except Exception as e:
+                print(f"Analysis worker error: {e}")
+            # Jobs claimed by a worker that then failed stay 'running'; recover them while idle
+            if asyncio.get_running_loop().time() - self._last_requeue >= REQUEUE_INTERVAL_SECONDS:
+                try:
+                    await self._requeue_stale()
+                except Exception as e:
+                    print(f"Requeue of stale analysis jobs failed: {e}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), POLL_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+
+worker_pool = AnalysisWorkerPool()
@@ -0,0 +1,110 @@
+import json
+from sqlalchemy import func, insert, exists, case
+from models import SurveyAnswer, SurveyResponse
+from aggregates import UNKNOWN_LABEL, DIMENSIONS
+from data_versions import bump_survey_versions
+
+
+def answer_rows(response_id: int, survey_id: int, answers: dict) -> list:
+    """Flatten an answers dict into survey_answers rows; nested dicts become 'key.nested_key'."""
+    rows = []
+    for key, value in (answers or {}).items():
+        if isinstance(value, dict):
+            rows.extend(
+                {"response_id": response_id, "survey_id": survey_id, "question_key": f"{key}.{nested_key}",
+                 "value": nested_value}
+                for nested_key, nested_value in value.items() if isinstance(nested_value, str)
+            )
+        elif value is not None:
+            rows.append({"response_id": response_id, "survey_id": survey_id, "question_key": str(key),
+                         "value": value if isinstance(value, str) else json.dumps(value)})
+    return rows
+
+
+def store_answers(db, response_id: int, survey_id: int, answers: dict) -> None:
+    """Write one response's answers in the caller's transaction."""
+    rows = answer_rows(response_id, survey_id, answers)
+    if rows:
+        db.execute(insert(SurveyAnswer), rows)
+
+
+def backfill_answers(db, survey_id: int = None, chunk_size: int = 1000) -> int:
+    """
+    Copy answers out of the JSON blobs of responses that have no survey_answers rows yet.
+    Commits per chunk, so it can be interrupted and rerun. Returns the number of responses filled.
+    """
+    filled = 0
+    last_id = 0
+    while True:
+        query = db.query(SurveyResponse.id, SurveyResponse.survey_id, SurveyResponse.answers).filter(
+            SurveyResponse.id > last_id,
+            ~exists().where(SurveyAnswer.response_id == SurveyResponse.id),
+        )
+        if survey_id is not None:
+            query = query.filter(SurveyResponse.survey_id == survey_id)
+        rows = query.order_by(SurveyResponse.id).limit(chunk_size).all()
+        if not rows:
+            break
+        answer_batch = []
+        for response_id, row_survey_id, answers_json in rows:
+            try:
+                answers = json.loads(answers_json or "{}")
+            except json.JSONDecodeError:
+                continue
+            if isinstance(answers, dict):
+                answer_batch.extend(answer_rows(response_id, row_survey_id, answers))
+                filled += 1
+        if answer_batch:
+            db.execute(insert(SurveyAnswer), answer_batch)
+            bump_survey_versions(db, {row["survey_id"] for row in answer_batch})
+        db.commit()
+        last_id = rows[-1].id
+    return filled
+
+
+def ensure_answers(db) -> None:
+    """Backfill once for databases that predate the survey_answers table."""
+    if db.query(SurveyAnswer.id).first() is None and db.query(SurveyResponse.id).first() is not None:
+        backfill_answers(db)
+
+
+def question_stats(db, survey_id: int) -> list:
+    """Response count and answer length stats per question, as one GROUP BY."""
+    length = func.length(func.trim(SurveyAnswer.value))
+    rows = db.query(
+        SurveyAnswer.question_key,
+        func.count(SurveyAnswer.id),
+        func.sum(case((length > 0, 1), else_=0)),
+        func.min(length),
+        func.max(length),
+        func.avg(length),
+    ).filter(SurveyAnswer.survey_id == survey_id).group_by(SurveyAnswer.question_key).order_by(
+        SurveyAnswer.question_key
+    )
+    return [
+        {
+            "question_key": question_key,
+            "responses": count,
+            "non_empty": non_empty or 0,
+            "min_length": min_length or 0,
+            "max_length": max_length or 0,
+            "avg_length": round(float(avg_length or 0), 1),
+        }
+        for question_key, count, non_empty, min_length, max_length, avg_length in rows
+    ]
+
+
+def label_by_question(db, survey_id: int, dimension: str = "sentiment") -> list:
+    """Count of each response label (sentiment or burnout_risk) per question, as one GROUP BY."""
+    if dimension not in DIMENSIONS:
+        raise ValueError(f"dimension must be one of {', '.join(DIMENSIONS)}")
+    label = func.coalesce(getattr(SurveyResponse, dimension), UNKNOWN_LABEL)
+    rows = db.query(SurveyAnswer.question_key, label, func.count(SurveyAnswer.id)).join(
+        SurveyResponse, SurveyAnswer.response_id == SurveyResponse.id
+    ).filter(SurveyAnswer.survey_id == survey_id).group_by(SurveyAnswer.question_key, label).order_by(
+        SurveyAnswer.question_key, label
+    )
+    by_question = {}
+    for question_key, row_label, count in rows:
+        by_question.setdefault(question_key, []).append({"label": row_label, "value": count})
+    return [{"question_key": key, dimension: labels} for key, labels in by_question.items()]
@@ -0,0 +1,57 @@
+from sqlalchemy import insert, delete, func
+from models import User, SurveyAssignment
+
+# Keeps IN lists well below SQLite's bound-parameter limit
+IN_CHUNK_SIZE = 5000
+
+
+def _chunks(values: list, size: int = IN_CHUNK_SIZE):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def resolve_target_users(db, user_ids: list, roles: list) -> tuple:
+    """
+    Return (valid_user_ids, invalid_user_ids) for explicit ids plus every user
+    holding one of `roles`, using set-based queries instead of one SELECT per id.
+    """
+    requested = sorted(set(user_ids))
+    valid = set()
+    for chunk in _chunks(requested):
+        valid.update(user_id for (user_id,) in db.query(User.id).filter(User.id.in_(chunk)))
+    invalid = [user_id for user_id in requested if user_id not in valid]
+
+    normalized_roles = sorted({role.lower() for role in roles})
+    if normalized_roles:
+        valid.update(
+            user_id for (user_id,) in db.query(User.id).filter(func.lower(User.role).in_(normalized_roles))
+        )
+    return valid, invalid
+
+
+def sync_assignments(db, survey_id: int, target_user_ids: set) -> dict:
+    """
+    Make the survey's assignments equal `target_user_ids`, writing only the difference.
+    The caller commits.
+    """
+    existing = {
+        user_id for (user_id,) in db.query(SurveyAssignment.user_id).filter(SurveyAssignment.survey_id == survey_id)
+    }
+    to_add = sorted(target_user_ids - existing)
+    to_remove = sorted(existing - target_user_ids)
+
+    for chunk in _chunks(to_remove):
+        db.execute(
+            delete(SurveyAssignment).where(
+                SurveyAssignment.survey_id == survey_id,
+                SurveyAssignment.user_id.in_(chunk),
+            )
+        )
+    for chunk in _chunks(to_add):
+        db.execute(insert(SurveyAssignment), [{"survey_id": survey_id, "user_id": user_id} for user_id in chunk])
+
+    return {
+        "added": len(to_add),
+        "removed": len(to_remove),
+        "unchanged": len(existing & target_user_ids),
+    }
@@ -0,0 +1,325 @@
+"""
+End-to-end load and latency benchmark against a stub LLM.
+
+    cd survey_backend && python -m benchmarks.load --employees 200 --concurrency 20 --output bench.json
+
+Reports latency percentiles per endpoint, and wall time and SQL statements per phase.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import tempfile
+import threading
+from types import SimpleNamespace
+
+import httpx
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def configure_environment(args, stub_url: str) -> str:
+    """Point the app at a throwaway database, cache and the stub LLM. Must run before importing app modules."""
+    work_dir = tempfile.mkdtemp(prefix="survey-load-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(work_dir, 'load.db')}"
+    os.environ.pop("DATABASE_READ_URL", None)
+    os.environ["ANALYSIS_CACHE_PATH"] = os.path.join(work_dir, "analysis_cache.db")
+    os.environ["PERPLEXITY_BASE_URL"] = stub_url
+    os.environ["PERPLEXITY_API_KEY"] = "stub"
+    os.environ["ANALYSIS_WORKERS"] = str(args.analysis_workers)
+    os.environ.setdefault("LIVE_BROKER", "local")
+    return work_dir
+
+
+class QueryCounter:
+    """Counts SQL statements executed through the app's engines (sync and async)."""
+
+    def __init__(self, engines):
+        self.count = 0
+        self._lock = threading.Lock()
+        from sqlalchemy import event
+
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args) -> None:
+        with self._lock:
+            self.count += 1
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = {}
+        self.errors = {}
+
+    def add(self, name: str, seconds: float, ok: bool) -> None:
+        self.samples.setdefault(name, []).append(seconds)
+        if not ok:
+            self.errors[name] = self.errors.get(name, 0) + 1
+
+    def summary(self, wall_seconds: dict) -> dict:
+        report = {}
+        for name, values in self.samples.items():
+            values = sorted(values)
+            report[name] = {
+                "requests": len(values),
+                "errors": self.errors.get(name, 0),
+                "p50_ms": round(percentile(values, 0.50) * 1000, 2),
+                "p95_ms": round(percentile(values, 0.95) * 1000, 2),
+                "p99_ms": round(percentile(values, 0.99) * 1000, 2),
+                "mean_ms": round(sum(values) / len(values) * 1000, 2),
+                "throughput_rps": round(len(values) / wall_seconds[name], 1) if wall_seconds.get(name) else None,
+            }
+        return report
+
+
+async def drive(client: httpx.AsyncClient, recorder: Recorder, name: str, requests: list, concurrency: int) -> float:
+    """Send (method, url, kwargs) requests with at most `concurrency` in flight. Returns wall seconds."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(method, url, kwargs):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, url, **kwargs)
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            recorder.add(name, time.perf_counter() - started, ok)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(*request) for request in requests))
+    return time.perf_counter() - started
+
+
+async def first_event(client: httpx.AsyncClient, url: str, headers: dict) -> httpx.Response:
+    """Open an SSE stream and return once the initial snapshot arrives."""
+    async with client.stream("GET", url, headers=headers) as response:
+        async for line in response.aiter_lines():
+            if line.startswith("data:"):
+                break
+        return response
+
+
+def seed(args) -> dict:
+    """Insert the synthetic org directly: one admin, N employees, and the surveys."""
+    from sqlalchemy import insert
+    from database import engine
+    from models import User, Survey
+    from password_hashing import get_password_hash
+
+    hashed = get_password_hash(args.password)  # one bcrypt for everyone keeps seeding fast
+    users = [{"username": "bench_admin", "hashed_password": hashed, "role": "admin"}]
+    users += [{"username": f"employee_{i:05d}", "hashed_password": hashed, "role": "employee"}
+              for i in range(args.employees)]
+    surveys = [{"title": f"Pulse survey {i + 1}", "published": False,
+                "questions": json.dumps(["How is your workload?", "Do you feel supported?",
+                                         "What would you improve?"])}
+               for i in range(args.surveys)]
+    with engine.begin() as conn:
+        conn.execute(insert(User), users)
+        conn.execute(insert(Survey), surveys)
+        user_rows = conn.exec_driver_sql("SELECT id, username, role FROM users ORDER BY id").all()
+        survey_ids = [row[0] for row in conn.exec_driver_sql("SELECT id FROM surveys ORDER BY id")]
+    return {
+        "admin": next(SimpleNamespace(id=r[0], username=r[1], role=r[2]) for r in user_rows if r[2] == "admin"),
+        "employees": [SimpleNamespace(id=r[0], username=r[1], role=r[2]) for r in user_rows if r[2] == "employee"],
+        "survey_ids": survey_ids,
+    }
+
+
+ANSWER_SAMPLES = (
+    "The project timeline is aggressive and I have been working late three times a week.",
+    "I feel supported by my manager, but the wider team is stretched too thin.",
+    "More clarity on priorities and fewer meetings would reduce stress a lot.",
+    "Things are fine overall, workload is manageable this quarter.",
+    "n/a",
+)
+
+
+def pending_jobs() -> int:
+    from sqlalchemy import func
+    from database import SessionLocal
+    from models import AnalysisJob
+
+    with SessionLocal() as db:
+        return db.query(func.count(AnalysisJob.id)).filter(AnalysisJob.status.in_(("pending", "running"))).scalar()
+
+
+async def run(args, base_url: str, org: dict, counter: QueryCounter) -> dict:
+    from main import create_user_access_token
+
+    recorder = Recorder()
+    wall = {}
+    phases = {}
+    admin_headers = {"Authorization": f"Bearer {create_user_access_token(org['admin'])}"}
+    employee_headers = [{"Authorization": f"Bearer {create_user_access_token(user)}"} for user in org["employees"]]
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+
+        async def phase(name: str, coroutine):
+            queries_before = counter.count
+            started = time.perf_counter()
+            result = await coroutine
+            phases[name] = {"seconds": round(time.perf_counter() - started, 3),
+                            "db_queries": counter.count - queries_before}
+            return result
+
+        logins = [("POST", "/token", {"data": {"username": user.username, "password": args.password}})
+                  for user in org["employees"][:args.logins]]
+        wall["POST /token"] = await phase("login", drive(client, recorder, "POST /token", logins, args.concurrency))
+
+        assignments = [("POST", "/survey-assignments/", {"json": {"survey_id": survey_id, "roles": ["employee"]},
+                                                         "headers": admin_headers})
+                       for survey_id in org["survey_ids"]]
+        wall["POST /survey-assignments/"] = await phase(
+            "assign", drive(client, recorder, "POST /survey-assignments/", assignments, args.concurrency))
+
+        submits = [
+            ("POST", "/survey-responses/", {"headers": headers, "json": {"survey_id": survey_id, "answers": {
+                "q1_workload": ANSWER_SAMPLES[(i + survey_id) % len(ANSWER_SAMPLES)],
+                "q2_support": ANSWER_SAMPLES[(i * 7 + survey_id) % len(ANSWER_SAMPLES)],
+                "q3_improve": ANSWER_SAMPLES[(i * 3 + 1) % len(ANSWER_SAMPLES)] + f" (#{i})",
+            }}})
+            for survey_id in org["survey_ids"]
+            for i, headers in enumerate(employee_headers)
+        ]
+        wall["POST /survey-responses/"] = await phase(
+            "submit", drive(client, recorder, "POST /survey-responses/", submits, args.concurrency))
+
+        async def drain():
+            deadline = time.monotonic() + args.analysis_timeout
+            while time.monotonic() < deadline:
+                remaining = await asyncio.to_thread(pending_jobs)
+                if not remaining:
+                    return 0
+                await asyncio.sleep(0.25)
+            return await asyncio.to_thread(pending_jobs)
+
+        left = await phase("analysis", drain())
+        phases["analysis"]["jobs_left"] = left
+        phases["analysis"]["jobs_per_sec"] = round(
+            len(submits) / phases["analysis"]["seconds"], 1) if phases["analysis"]["seconds"] else None
+
+        survey_id = org["survey_ids"][0]
+        read_endpoints = {
+            "GET /analysis/cache-stats": "/analysis/cache-stats",
+            "GET /analysis/survey/{id}/distribution": f"/analysis/survey/{survey_id}/distribution",
+            "GET /analysis/survey/{id}/text-data": f"/analysis/survey/{survey_id}/text-data",
+            "GET /analysis/survey/{id}/report-table": f"/analysis/survey/{survey_id}/report-table",
+            "GET /analysis/survey/{id}/questions": f"/analysis/survey/{survey_id}/questions",
+            "GET /analysis/survey/{id}/questions/labels": f"/analysis/survey/{survey_id}/questions/labels",
+            "GET /analysis/survey/{id}/trend": f"/analysis/survey/{survey_id}/trend?granularity=hour",
+        }
+        queries_before = counter.count
+        started = time.perf_counter()
+        for name, url in read_endpoints.items():
+            wall[name] = await drive(client, recorder, name, [("GET", url, {"headers": admin_headers})] * args.reads,
+                                     args.concurrency)
+        # SSE: time to the first snapshot event
+        events_url = f"/analysis/survey/{survey_id}/events"
+        name = "GET /analysis/survey/{id}/events (first event)"
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def open_stream():
+            async with semaphore:
+                stream_started = time.perf_counter()
+                try:
+                    response = await first_event(client, events_url, admin_headers)
+                    ok = response.status_code < 400
+                except httpx.HTTPError:
+                    ok = False
+                recorder.add(name, time.perf_counter() - stream_started, ok)
+
+        stream_started = time.perf_counter()
+        await asyncio.gather(*(open_stream() for _ in range(min(args.reads, 50))))
+        wall[name] = time.perf_counter() - stream_started
+        phases["reads"] = {"seconds": round(time.perf_counter() - started, 3),
+                           "db_queries": counter.count - queries_before}
+
+    for name in phases:
+        requests = {"login": "POST /token", "assign": "POST /survey-assignments/",
+                    "submit": "POST /survey-responses/"}.get(name)
+        if requests and recorder.samples.get(requests):
+            phases[name]["db_queries_per_request"] = round(phases[name]["db_queries"] / len(recorder.samples[requests]), 2)
+    return {"endpoints": recorder.summary(wall), "phases": phases}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="End-to-end load and latency benchmark")
+    parser.add_argument("--employees", type=int, default=200)
+    parser.add_argument("--surveys", type=int, default=1)
+    parser.add_argument("--logins", type=int, default=20, help="employees that log in through POST /token")
+    parser.add_argument("--reads", type=int, default=100, help="requests per analytics endpoint")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--analysis-workers", type=int, default=4)
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="stub LLM seconds per call")
+    parser.add_argument("--llm-jitter", type=float, default=0.05)
+    parser.add_argument("--llm-failure-rate", type=float, default=0.05, help="share of stub calls answered 429/500")
+    parser.add_argument("--analysis-timeout", type=float, default=300.0)
+    parser.add_argument("--timeout", type=float, default=60.0, help="HTTP client timeout")
+    parser.add_argument("--password", default="benchpass123")
+    parser.add_argument("--output", help="write the JSON report here as well as to stdout")
+    args = parser.parse_args()
+
+    from benchmarks.stub_llm import StubLLMServer
+
+    stub = StubLLMServer(_free_port(), latency=args.llm_latency, jitter=args.llm_jitter,
+                         failure_rate=args.llm_failure_rate)
+    stub.start()
+    work_dir = configure_environment(args, stub.base_url)
+
+    import uvicorn
+    from database import engine, async_engine
+    from main import app
+    from perplexityai_analysis import llm, token_stats
+
+    org = seed(args)
+    counter = QueryCounter({engine, async_engine.sync_engine})
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, name="survey-api", daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    try:
+        results = asyncio.run(run(args, f"http://127.0.0.1:{port}", org, counter))
+    finally:
+        server.should_exit = True
+        thread.join(timeout=30)
+        stub.stop()
+
+    report = {
+        "config": {key: value for key, value in vars(args).items() if key not in ("password", "output")},
+        "database": os.environ["DATABASE_URL"],
+        "work_dir": work_dir,
+        **results,
+        "stub_llm": dict(stub.counters),
+        "llm_client": llm.stats(),
+        "llm_tokens": token_stats(),
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    sys.stdout.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
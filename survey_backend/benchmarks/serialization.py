@@ -0,0 +1,105 @@
+"""
+Rows/sec of GET /survey-responses/{survey_id} serialization, ORM path vs orjson fast path.
+
+    cd survey_backend && python -m benchmarks.serialization --rows 5000
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+
+_db_dir = tempfile.mkdtemp(prefix="survey-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'bench.db')}"
+os.environ.pop("DATABASE_READ_URL", None)
+os.environ.setdefault("PERPLEXITY_API_KEY", "benchmark")
+
+from typing import List  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+from sqlalchemy import select, insert  # noqa: E402
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from database import Base, engine, AsyncSessionLocal  # noqa: E402
+from models import User, Survey, SurveyResponse  # noqa: E402
+from serialization import FastJSONResponse, select_responses, response_rows  # noqa: E402
+from compression import _Compressor, brotli  # noqa: E402
+
+SAMPLE_ANSWERS = {
+    "q1_workload_level": "The current project timeline is highly aggressive, and I've been working late.",
+    "q2_support_felt": "I feel supported by my direct manager, but the broader team is stretched too thin.",
+    "q3_satisfaction_rating": "4/5",
+    "q4_area_for_improvement": "More clarity on departmental priorities and a better meeting structure.",
+}
+
+
+def seed(rows: int) -> None:
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"id": 1, "username": "bench", "hashed_password": "x", "role": "employee"}])
+        conn.execute(insert(Survey), [{"id": 1, "title": "Bench", "questions": "[]", "published": True}])
+        conn.execute(insert(SurveyResponse), [
+            {"survey_id": 1, "user_id": 1, "answers": json.dumps(SAMPLE_ANSWERS),
+             "sentiment": "Neutral", "burnout_risk": "Low"}
+            for _ in range(rows)
+        ])
+
+
+async def before(adapter) -> bytes:
+    async with AsyncSessionLocal() as db:
+        objs = (await db.execute(select(SurveyResponse).where(SurveyResponse.survey_id == 1))).scalars().all()
+        validated = adapter.validate_python(objs, from_attributes=True)
+        return json.dumps(jsonable_encoder(validated)).encode("utf-8")
+
+
+async def after() -> bytes:
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(select_responses(1))).all()
+        return FastJSONResponse(response_rows(rows)).body
+
+
+async def timed(fn, *args, repeat: int) -> tuple:
+    await fn(*args)  # warm-up
+    started = time.perf_counter()
+    for _ in range(repeat):
+        body = await fn(*args)
+    return (time.perf_counter() - started) / repeat, body
+
+
+def compressed_size(body: bytes, encoding: str) -> int:
+    compressor = _Compressor(encoding)
+    return len(compressor.compress(body) + compressor.finish())
+
+
+async def run(rows: int, repeat: int) -> dict:
+    from main import SurveyResponseOut  # imported late so it binds to the throwaway database
+
+    adapter = TypeAdapter(List[SurveyResponseOut])
+    before_seconds, before_body = await timed(before, adapter, repeat=repeat)
+    after_seconds, after_body = await timed(after, repeat=repeat)
+    assert json.loads(before_body) == json.loads(after_body), "fast path changed the payload"
+    report = {
+        "rows": rows,
+        "before_rows_per_sec": round(rows / before_seconds),
+        "after_rows_per_sec": round(rows / after_seconds),
+        "speedup": round(before_seconds / after_seconds, 2),
+        "payload_bytes": len(after_body),
+        "gzip_bytes": compressed_size(after_body, "gzip"),
+    }
+    if brotli is not None:
+        report["br_bytes"] = compressed_size(after_body, "br")
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    seed(args.rows)
+    json.dump(asyncio.run(run(args.rows, args.repeat)), sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Local stand-in for the Perplexity chat-completions API with configurable latency and failure rate.
+"""
+import json
+import time
+import random
+import asyncio
+import threading
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+TONES = ("Positive", "Neutral", "Negative")
+RISKS = ("Low", "Medium", "High")
+
+
+def _analysis(rng: random.Random) -> dict:
+    # The compact reply schema the prompts ask for (token_budget.COMPACT_KEYS)
+    return {
+        "t": rng.choice(TONES),
+        "s": rng.choice(RISKS),
+        "b": rng.choice(RISKS),
+        "c": ["workload"],
+        "v": round(rng.uniform(-1, 1), 2),
+    }
+
+
+def _reply_content(prompt: str, rng: random.Random) -> str:
+    ids = []
+    for line in prompt.splitlines():
+        line = line.strip()
+        if line.startswith("{") and '"id"' in line:
+            try:
+                ids.append(json.loads(line)["id"])
+            except (json.JSONDecodeError, KeyError):
+                continue
+    if ids:
+        return json.dumps([{"id": item_id, **_analysis(rng)} for item_id in ids])
+    return json.dumps(_analysis(rng))
+
+
+class StubLLMServer:
+    def __init__(self, port: int, latency: float = 0.2, jitter: float = 0.05, failure_rate: float = 0.0,
+                 seed: int = 7):
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.rng = random.Random(seed)
+        self.counters = {"requests": 0, "failures": 0, "prompt_chars": 0}
+        self._server = None
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    async def _chat_completions(self, request: Request):
+        body = await request.json()
+        self.counters["requests"] += 1
+        prompt = body["messages"][-1]["content"]
+        self.counters["prompt_chars"] += len(prompt)
+        await asyncio.sleep(self.latency + self.rng.uniform(0, self.jitter))
+        if self.rng.random() < self.failure_rate:
+            self.counters["failures"] += 1
+            status = self.rng.choice((429, 500))
+            return JSONResponse({"error": {"message": "stub failure", "code": status}}, status_code=status)
+        content = _reply_content(prompt, self.rng)
+        return JSONResponse({
+            "id": f"stub-{self.counters['requests']}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4,
+                      "total_tokens": (len(prompt) + len(content)) // 4},
+        })
+
+    def start(self) -> None:
+        app = Starlette(routes=[Route("/chat/completions", self._chat_completions, methods=["POST"])])
+        self._server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning"))
+        self._thread = threading.Thread(target=self._server.run, name="stub-llm", daemon=True)
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.05)
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.should_exit = True
+            self._thread.join(timeout=10)
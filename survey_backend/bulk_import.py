@@ -0,0 +1,161 @@
+import csv
+import json
+import codecs
+from pydantic import ValidationError
+from sqlalchemy import insert
+from models import User
+from password_hashing import hash_pool, HashPoolSaturated
+
+# ==============================
+# CONFIGURATION
+# ==============================
+IMPORT_CHUNK_SIZE = 500
+IMPORT_FIELDS = ("username", "password", "role")
+NOT_PROCESSED = "Not processed: password hashing is busy, retry this row later"
+
+
+async def iter_lines(byte_stream):
+    """Yield (line_number, text) from an async byte stream without buffering the whole body."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+    line_number = 0
+    async for chunk in byte_stream:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            line_number += 1
+            yield line_number, line.rstrip("\r")
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield line_number + 1, buffer.rstrip("\r")
+
+
+async def iter_records(byte_stream, fmt: str):
+    """
+    Yield (line_number, dict_or_None, error) for each data row.
+    CSV needs a header row; quoted fields may not span lines.
+    """
+    header = None
+    async for line_number, line in iter_lines(byte_stream):
+        if not line.strip():
+            continue
+        if fmt == "ndjson":
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_number, None, f"Invalid JSON: {e.msg}"
+                continue
+            if not isinstance(record, dict):
+                yield line_number, None, "Each line must be a JSON object"
+                continue
+            yield line_number, record, None
+            continue
+
+        values = next(csv.reader([line]))
+        if header is None:
+            header = [value.strip().lower() for value in values]
+            missing = [field for field in IMPORT_FIELDS if field not in header]
+            if missing:
+                raise ValueError(f"CSV header is missing columns: {', '.join(missing)}")
+            continue
+        if len(values) != len(header):
+            yield line_number, None, f"Expected {len(header)} columns, got {len(values)}"
+            continue
+        yield line_number, dict(zip(header, values)), None
+
+
+def _existing_usernames(db, usernames: list) -> set:
+    return {username for (username,) in db.query(User.username).filter(User.username.in_(usernames))}
+
+
+def _insert_chunk(db, new_rows: list, report: dict) -> None:
+    """Insert hashed rows in one statement, falling back to per-row inserts on a conflict."""
+    try:
+        db.execute(insert(User), [
+            {"username": row["username"], "hashed_password": row["hashed_password"], "role": row["role"]}
+            for row in new_rows
+        ])
+        db.commit()
+        report["created"] += len(new_rows)
+        return
+    except Exception:
+        db.rollback()
+
+    # A concurrent writer took one of the usernames; fall back to per-row inserts for this chunk
+    for row in new_rows:
+        try:
+            db.add(User(username=row["username"], hashed_password=row["hashed_password"], role=row["role"]))
+            db.commit()
+            report["created"] += 1
+        except Exception as e:
+            db.rollback()
+            report["errors"].append({"line": row["line"], "username": row["username"], "error": str(e.__class__.__name__)})
+
+
+async def import_users(db, byte_stream, fmt: str, user_schema) -> dict:
+    """
+    Stream-import users from CSV or NDJSON into an AsyncSession, hashing passwords on the shared hash pool.
+    Returns a per-row error report instead of aborting on bad rows; when hashing is saturated the
+    remaining rows are reported as not processed.
+    """
+    report = {"created": 0, "errors": []}
+    seen = set()
+    chunk = []
+    saturated = False
+
+    def not_processed(rows):
+        report["errors"].extend({"line": row["line"], "username": row["username"], "error": NOT_PROCESSED}
+                                for row in rows)
+
+    async def flush(rows) -> bool:
+        """Insert a chunk; False when the hash pool is saturated and the rest of the import is skipped."""
+        existing = await db.run_sync(_existing_usernames, [row["username"] for row in rows])
+        new_rows = []
+        for row in rows:
+            if row["username"] in existing:
+                report["errors"].append({"line": row["line"], "username": row["username"],
+                                         "error": "Username already registered"})
+            else:
+                new_rows.append(row)
+        if not new_rows:
+            return True
+        try:
+            hashes = await hash_pool.hash_many([row["password"] for row in new_rows])
+        except HashPoolSaturated:
+            not_processed(new_rows)
+            return False
+        for row, hashed_password in zip(new_rows, hashes):
+            row["hashed_password"] = hashed_password
+            del row["password"]
+        await db.run_sync(_insert_chunk, new_rows, report)
+        return True
+
+    async for line_number, record, error in iter_records(byte_stream, fmt):
+        if error:
+            report["errors"].append({"line": line_number, "username": None, "error": error})
+            continue
+        if saturated:
+            not_processed([{"line": line_number, "username": record.get("username")}])
+            continue
+        try:
+            user_in = user_schema(**{field: record.get(field) for field in IMPORT_FIELDS})
+        except ValidationError as e:
+            report["errors"].append({"line": line_number, "username": record.get("username"),
+                                     "error": "; ".join(err["msg"] for err in e.errors())})
+            continue
+        if user_in.username in seen:
+            report["errors"].append({"line": line_number, "username": user_in.username,
+                                     "error": "Duplicate username in file"})
+            continue
+        seen.add(user_in.username)
+        chunk.append({"line": line_number, "username": user_in.username,
+                      "password": user_in.password, "role": user_in.role})
+        if len(chunk) >= IMPORT_CHUNK_SIZE:
+            saturated = not await flush(chunk)
+            chunk = []
+    if chunk and not saturated:
+        await flush(chunk)
+
+    report["errors"].sort(key=lambda err: err["line"])
+    report["failed"] = len(report["errors"])
+    return report
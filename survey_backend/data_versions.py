@@ -0,0 +1,60 @@
+"""
+Per-survey data versions, bumped with every write the analytics endpoints show, for ETags and 304s.
+"""
+import hashlib
+from fastapi import Request, Response
+from sqlalchemy import select, update, func
+from models import Survey
+
+ETAG_HEADER = "ETag"
+CACHE_CONTROL = "private, no-cache"  # browsers may store the response but must revalidate
+
+
+def bump_survey_versions(db, survey_ids=None) -> None:
+    """Increment the data version of the given surveys (all surveys when None) in the caller's transaction."""
+    stmt = update(Survey).values(data_version=Survey.data_version + 1)
+    if survey_ids is not None:
+        survey_ids = sorted(set(survey_ids))
+        if not survey_ids:
+            return
+        stmt = stmt.where(Survey.id.in_(survey_ids))
+    db.execute(stmt.execution_options(synchronize_session=False))
+
+
+async def survey_version(db, survey_id: int):
+    """Return the survey's data version, or None if the survey does not exist."""
+    return (await db.execute(select(Survey.data_version).where(Survey.id == survey_id))).scalar()
+
+
+async def survey_list_version(db) -> str:
+    """Changes whenever a survey is created, published or has its data bumped."""
+    count, max_id, versions = (await db.execute(
+        select(func.count(Survey.id), func.max(Survey.id), func.sum(Survey.data_version))
+    )).one()
+    return f"{count}.{max_id or 0}.{versions or 0}"
+
+
+def make_etag(scope: str, version, request: Request) -> str:
+    """Weak ETag over the resource, its data version and the query string (page, fields, top_k...)."""
+    digest = hashlib.sha1(f"{scope}|{version}|{request.url.query}".encode("utf-8")).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak comparison: ignore the W/ prefix on either side
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={ETAG_HEADER: etag, "Cache-Control": CACHE_CONTROL})
+
+
+def set_etag(response: Response, etag: str) -> None:
+    response.headers[ETAG_HEADER] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
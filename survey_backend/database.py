@@ -0,0 +1,35 @@
+import os
+from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from storage import build_engine, build_async_engine
+
+# ==============================
+# CONFIGURATION
+# ==============================
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./survey_app.db")
+# Optional read replica for the analytics GET endpoints; defaults to the primary
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")
+
+Base = declarative_base()
+
+# Sync engines: schema setup, migrations, manage.py commands and background jobs
+engine = build_engine(DATABASE_URL)
+read_engine = build_engine(DATABASE_READ_URL) if DATABASE_READ_URL else engine
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+# Async engines: the request path
+async_engine = build_async_engine(DATABASE_URL)
+async_read_engine = build_async_engine(DATABASE_READ_URL) if DATABASE_READ_URL else async_engine
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+AsyncReadSessionLocal = async_sessionmaker(async_read_engine, autoflush=False, expire_on_commit=False)
+
+
+async def get_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_read_db():
+    async with AsyncReadSessionLocal() as db:
+        yield db
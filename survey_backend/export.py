@@ -0,0 +1,69 @@
+import io
+import csv
+import orjson
+from sqlalchemy import select
+from models import SurveyResponse
+from serialization import parse_answers
+
+EXPORT_CHUNK_SIZE = 1000
+EXPORT_COLUMNS = ("id", "survey_id", "user_id", "sentiment", "burnout_risk", "answers", "submitted_at")
+
+
+async def iter_response_chunks(session_factory, survey_id: int, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """Yield pages of response rows by keyset pagination on the primary key, one short query each."""
+    async with session_factory() as db:
+        last_id = 0
+        while True:
+            result = await db.stream(
+                select(
+                    SurveyResponse.id,
+                    SurveyResponse.survey_id,
+                    SurveyResponse.user_id,
+                    SurveyResponse.sentiment,
+                    SurveyResponse.burnout_risk,
+                    SurveyResponse.answers,
+                    SurveyResponse.submitted_at,
+                )
+                .where(SurveyResponse.survey_id == survey_id, SurveyResponse.id > last_id)
+                .order_by(SurveyResponse.id)
+                .limit(chunk_size)
+                .execution_options(yield_per=chunk_size)
+            )
+            rows = await result.all()
+            if not rows:
+                return
+            yield rows
+            last_id = rows[-1].id
+
+
+async def stream_ndjson(session_factory, survey_id: int):
+    async for rows in iter_response_chunks(session_factory, survey_id):
+        yield b"".join(
+            orjson.dumps({
+                "id": row.id,
+                "survey_id": row.survey_id,
+                "user_id": row.user_id,
+                "sentiment": row.sentiment,
+                "burnout_risk": row.burnout_risk,
+                "answers": parse_answers(row.answers),
+                "submitted_at": row.submitted_at,
+            }) + b"\n"
+            for row in rows
+        )
+
+
+async def stream_csv(session_factory, survey_id: int):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    yield buffer.getvalue()
+    async for rows in iter_response_chunks(session_factory, survey_id):
+        buffer.seek(0)
+        buffer.truncate()
+        for row in rows:
+            # answers stay a JSON object string so the CSV has a fixed set of columns
+            writer.writerow([
+                row.id, row.survey_id, row.user_id, row.sentiment, row.burnout_risk, row.answers or "{}",
+                row.submitted_at.isoformat() if row.submitted_at else "",
+            ])
+        yield buffer.getvalue()
@@ -0,0 +1,158 @@
+"""
+Local lexicon scorer: term-count matrices times polarity and burnout weights, with negation.
+Confidence combines evidence, agreement and coverage; low-confidence text goes to the LLM.
+"""
+import re
+import numpy as np
+
+LEXICON_VERSION = "1"
+
+# term: (polarity -1..1, burnout weight 0..1)
+LEXICON = {
+    # positive
+    "good": (0.6, 0), "great": (0.8, 0), "excellent": (0.9, 0), "amazing": (0.9, 0), "awesome": (0.8, 0),
+    "happy": (0.8, 0), "glad": (0.6, 0), "love": (0.8, 0), "enjoy": (0.7, 0), "enjoying": (0.7, 0),
+    "fine": (0.3, 0), "okay": (0.2, 0), "ok": (0.2, 0), "thanks": (0.4, 0), "thank": (0.4, 0),
+    "supported": (0.7, 0), "supportive": (0.7, 0), "helpful": (0.6, 0), "valued": (0.7, 0),
+    "appreciated": (0.7, 0), "motivated": (0.7, 0), "engaged": (0.6, 0), "satisfied": (0.7, 0),
+    "manageable": (0.5, 0), "balanced": (0.5, 0), "flexible": (0.5, 0), "clear": (0.4, 0),
+    "productive": (0.6, 0), "positive": (0.6, 0), "rewarding": (0.7, 0), "fair": (0.4, 0),
+    "comfortable": (0.5, 0), "relaxed": (0.6, 0), "calm": (0.5, 0), "improving": (0.4, 0),
+    "better": (0.3, 0), "fun": (0.6, 0), "proud": (0.7, 0), "recognized": (0.6, 0),
+    "work life balance": (0.5, 0), "all good": (0.7, 0), "well supported": (0.8, 0),
+    # negative
+    "bad": (-0.6, 0.1), "poor": (-0.6, 0.1), "terrible": (-0.9, 0.2), "awful": (-0.9, 0.2),
+    "unhappy": (-0.8, 0.2), "sad": (-0.6, 0.2), "frustrated": (-0.7, 0.4), "frustrating": (-0.7, 0.4),
+    "annoyed": (-0.5, 0.2), "angry": (-0.8, 0.3), "disappointed": (-0.7, 0.2), "unfair": (-0.6, 0.2),
+    "undervalued": (-0.7, 0.4), "ignored": (-0.6, 0.3), "unclear": (-0.4, 0.2), "confusing": (-0.4, 0.1),
+    "chaotic": (-0.6, 0.4), "toxic": (-0.9, 0.6), "micromanaged": (-0.7, 0.4), "micromanagement": (-0.7, 0.4),
+    "demotivated": (-0.7, 0.5), "unmotivated": (-0.7, 0.5), "bored": (-0.4, 0.1), "worse": (-0.5, 0.2),
+    "lack": (-0.4, 0.2), "lacking": (-0.4, 0.2), "problem": (-0.4, 0.1), "problems": (-0.4, 0.1),
+    "issue": (-0.3, 0.1), "issues": (-0.3, 0.1), "concern": (-0.3, 0.1), "concerns": (-0.3, 0.1),
+    "aggressive": (-0.5, 0.5), "thin": (-0.3, 0.3), "isolated": (-0.6, 0.5), "lonely": (-0.6, 0.5),
+    # stress and burnout
+    "stress": (-0.5, 0.7), "stressed": (-0.6, 0.8), "stressful": (-0.6, 0.7), "pressure": (-0.4, 0.6),
+    "overwhelmed": (-0.7, 0.9), "overwhelming": (-0.6, 0.8), "exhausted": (-0.7, 1.0), "exhausting": (-0.7, 0.9),
+    "tired": (-0.5, 0.6), "drained": (-0.7, 0.9), "burnout": (-0.8, 1.0), "burnt out": (-0.8, 1.0),
+    "burned out": (-0.8, 1.0), "overworked": (-0.7, 0.9), "overtime": (-0.4, 0.6), "anxious": (-0.6, 0.7),
+    "anxiety": (-0.6, 0.7), "sleep": (-0.2, 0.4), "deadline": (-0.2, 0.4), "deadlines": (-0.2, 0.4),
+    "workload": (-0.1, 0.3), "too much": (-0.4, 0.5), "working late": (-0.4, 0.7), "late nights": (-0.4, 0.7),
+    "no time": (-0.4, 0.5), "understaffed": (-0.6, 0.7), "quit": (-0.7, 0.7), "quitting": (-0.7, 0.8),
+    "leave": (-0.3, 0.3), "struggling": (-0.6, 0.7), "struggle": (-0.5, 0.6), "unsustainable": (-0.7, 0.9),
+    "weekends": (-0.2, 0.5), "rushed": (-0.4, 0.5), "sick": (-0.4, 0.5), "cope": (-0.3, 0.5),
+}
+
+NEGATORS = frozenset({"not", "no", "never", "hardly", "isn't", "aren't", "don't", "doesn't", "didn't",
+                      "wasn't", "weren't", "can't", "cannot", "won't", "without"})
+NEGATION_WINDOW = 2
+_TOKEN = re.compile(r"[a-z][a-z']*")
+
+TONE_THRESHOLD = 0.2
+BURNOUT_MEDIUM = 0.8
+BURNOUT_HIGH = 1.8
+COVERAGE_TERMS_PER_TOKEN = 0.15  # a text this dense with lexicon terms counts as fully covered
+
+
+class LexiconAnalyzer:
+    """Vectorized lexicon scorer. analyze_texts() returns analyses shaped like the LLM's, plus 'confidence'."""
+
+    name = f"lexicon:v{LEXICON_VERSION}"
+
+    def __init__(self, lexicon: dict = LEXICON):
+        self.vocabulary = list(lexicon)
+        self.index = {term: i for i, term in enumerate(self.vocabulary)}
+        self.polarity = np.array([lexicon[term][0] for term in self.vocabulary], dtype=np.float64)
+        self.burnout = np.array([lexicon[term][1] for term in self.vocabulary], dtype=np.float64)
+        self.max_ngram = max(len(term.split()) for term in self.vocabulary)
+
+    def term_matrices(self, texts: list) -> tuple:
+        """
+        Return (plain, negated, token_counts): n_texts x vocabulary count matrices for
+        terms in plain and negated context, and the number of tokens in each text.
+        """
+        rows, cols, negated_flags = [], [], []
+        token_counts = np.zeros(len(texts), dtype=np.float64)
+        for row, text in enumerate(texts):
+            tokens = _TOKEN.findall((text or "").lower())
+            token_counts[row] = len(tokens)
+            negate_until = -1
+            position = 0
+            while position < len(tokens):
+                # Longest lexicon term first, so "no time" is a term rather than a negated "time"
+                for n in range(min(self.max_ngram, len(tokens) - position), 0, -1):
+                    term = " ".join(tokens[position:position + n])
+                    if term in self.index:
+                        rows.append(row)
+                        cols.append(self.index[term])
+                        negated_flags.append(position <= negate_until)
+                        position += n
+                        break
+                else:
+                    if tokens[position] in NEGATORS:
+                        negate_until = position + NEGATION_WINDOW
+                    position += 1
+
+        shape = (len(texts), len(self.vocabulary))
+        plain = np.zeros(shape, dtype=np.float64)
+        negated = np.zeros(shape, dtype=np.float64)
+        if rows:
+            rows, cols, negated_flags = np.array(rows), np.array(cols), np.array(negated_flags)
+            np.add.at(plain, (rows[~negated_flags], cols[~negated_flags]), 1)
+            np.add.at(negated, (rows[negated_flags], cols[negated_flags]), 1)
+        return plain, negated, token_counts
+
+    def score_matrices(self, plain: np.ndarray, negated: np.ndarray, token_counts: np.ndarray) -> dict:
+        """Vectorized scores for count matrices from term_matrices(); every value is an n_texts array."""
+        signed = plain - negated
+        hits = (plain + negated).sum(axis=1)
+        polarity_sum = signed @ self.polarity
+        polarity_mass = (plain + negated) @ np.abs(self.polarity)
+        burnout = plain @ self.burnout
+
+        safe_hits = np.maximum(hits, 1)
+        sentiment = np.clip(polarity_sum / safe_hits, -1, 1)
+        evidence = 1 - np.exp(-hits)
+        agreement = np.where(polarity_mass > 0, np.abs(polarity_sum) / np.maximum(polarity_mass, 1e-9), 0.0)
+        coverage = np.minimum(1.0, hits / np.maximum(COVERAGE_TERMS_PER_TOKEN * token_counts, 1))
+        return {
+            "sentiment": sentiment,
+            "burnout": burnout,
+            "hits": hits,
+            "confidence": evidence * agreement * coverage,
+        }
+
+    def _concerns(self, plain: np.ndarray, limit: int = 3) -> list:
+        weights = plain * (self.burnout + np.maximum(-self.polarity, 0))
+        top = np.argsort(-weights, axis=1)[:, :limit]
+        return [
+            [self.vocabulary[col] for col in row_top if weights[row, col] > 0]
+            for row, row_top in enumerate(top)
+        ]
+
+    def analyze_texts(self, texts: list) -> list:
+        plain, negated, token_counts = self.term_matrices(texts)
+        scores = self.score_matrices(plain, negated, token_counts)
+        concerns = self._concerns(plain)
+        tones = label_tones(scores["sentiment"])
+        risks = label_risks(scores["burnout"])
+        return [
+            {
+                "emotional_tone": str(tones[i]),
+                "stress_level": str(risks[i]),
+                "burnout_risk": str(risks[i]),
+                "key_concerns": concerns[i],
+                "sentiment_score": round(float(scores["sentiment"][i]), 3),
+                "confidence": round(float(scores["confidence"][i]), 3),
+                "analyzer": self.name,
+            }
+            for i in range(len(texts))
+        ]
+
+
+def label_tones(sentiment: np.ndarray) -> np.ndarray:
+    return np.where(sentiment > TONE_THRESHOLD, "Positive",
+                    np.where(sentiment < -TONE_THRESHOLD, "Negative", "Neutral"))
+
+
+def label_risks(burnout: np.ndarray) -> np.ndarray:
+    return np.where(burnout >= BURNOUT_HIGH, "High", np.where(burnout >= BURNOUT_MEDIUM, "Medium", "Low"))
@@ -0,0 +1,183 @@
+"""
+Live distribution deltas for admin dashboards over Server-Sent Events.
+LocalBroker serves one process; PostgresBroker relays through LISTEN/NOTIFY.
+"""
+import os
+import asyncio
+from collections import Counter
+import orjson
+
+# ==============================
+# CONFIGURATION
+# ==============================
+LIVE_BROKER = os.getenv("LIVE_BROKER", "local")  # 'local' or 'postgres'
+LIVE_CHANNEL = os.getenv("LIVE_CHANNEL", "survey_live_updates")
+SUBSCRIBER_QUEUE_SIZE = 256
+KEEPALIVE_SECONDS = 15.0
+
+RESYNC = {"type": "resync"}  # sent instead of deltas a slow subscriber missed
+CLOSED = None  # end-of-stream marker on shutdown
+
+
+def new_delta(survey_id: int) -> dict:
+    return {"survey_id": survey_id, "total": 0, "sentiment": Counter(), "burnout_risk": Counter()}
+
+
+def add_relabel(deltas: dict, survey_id: int, old_labels: tuple, new_labels: tuple) -> None:
+    """Accumulate a (sentiment, burnout_risk) label change into `deltas`, keyed by survey."""
+    delta = deltas.setdefault(survey_id, new_delta(survey_id))
+    for dimension, old_label, new_label in zip(("sentiment", "burnout_risk"), old_labels, new_labels):
+        if old_label != new_label:
+            delta[dimension][old_label] -= 1
+            delta[dimension][new_label] += 1
+
+
+def _clean(delta: dict) -> dict:
+    """Drop labels whose changes cancelled out; the result is JSON-ready."""
+    cleaned = dict(delta)
+    for dimension in ("sentiment", "burnout_risk"):
+        cleaned[dimension] = {label: n for label, n in delta[dimension].items() if n}
+    cleaned["type"] = "delta"
+    return cleaned
+
+
+class LocalFanout:
+    """Per-survey subscriber queues in this process."""
+
+    def __init__(self, queue_size: int = SUBSCRIBER_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers = {}
+
+    def subscribe(self, survey_id: int) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(survey_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, survey_id: int, queue: asyncio.Queue) -> None:
+        queues = self._subscribers.get(survey_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[survey_id]
+
+    def dispatch(self, event: dict) -> None:
+        for queue in self._subscribers.get(event["survey_id"], ()):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # The client fell behind: drop what it missed and have it reload a snapshot
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(RESYNC)
+
+    def close_all(self) -> None:
+        for queues in self._subscribers.values():
+            for queue in queues:
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(CLOSED)
+
+    def subscriber_count(self) -> int:
+        return sum(len(queues) for queues in self._subscribers.values())
+
+
+class LocalBroker:
+    """Delivers events to subscribers of this process only."""
+
+    def __init__(self):
+        self.fanout = LocalFanout()
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        self.fanout.close_all()
+
+    def subscribe(self, survey_id: int) -> asyncio.Queue:
+        return self.fanout.subscribe(survey_id)
+
+    def unsubscribe(self, survey_id: int, queue: asyncio.Queue) -> None:
+        self.fanout.unsubscribe(survey_id, queue)
+
+    async def publish(self, deltas) -> None:
+        for delta in deltas:
+            self.fanout.dispatch(_clean(delta))
+
+
+class PostgresBroker(LocalBroker):
+    """Relays events between API processes with PostgreSQL LISTEN/NOTIFY (one listening connection each)."""
+
+    def __init__(self, dsn: str, channel: str = LIVE_CHANNEL):
+        super().__init__()
+        self.dsn = dsn
+        self.channel = channel
+        self._conn = None
+        self._lock = None
+
+    async def start(self) -> None:
+        import asyncpg
+
+        self._lock = asyncio.Lock()
+        self._conn = await asyncpg.connect(self.dsn)
+        await self._conn.add_listener(self.channel, self._on_notify)
+
+    async def stop(self) -> None:
+        await super().stop()
+        if self._conn is not None:
+            await self._conn.close()
+            self._conn = None
+
+    def _on_notify(self, connection, pid, channel, payload) -> None:
+        self.fanout.dispatch(orjson.loads(payload))
+
+    async def publish(self, deltas) -> None:
+        # NOTIFY delivers to this process's own listener too, so no local dispatch here
+        async with self._lock:
+            for delta in deltas:
+                await self._conn.execute("SELECT pg_notify($1, $2)", self.channel, orjson.dumps(_clean(delta)).decode())
+
+
+def create_broker(kind: str = LIVE_BROKER):
+    if kind == "postgres":
+        from sqlalchemy.engine import make_url
+        from database import DATABASE_URL
+
+        # asyncpg wants a plain postgresql:// DSN without the SQLAlchemy driver suffix
+        url = make_url(DATABASE_URL)
+        if url.get_backend_name() != "postgresql":
+            raise ValueError("LIVE_BROKER=postgres needs a PostgreSQL DATABASE_URL")
+        return PostgresBroker(url.set(drivername="postgresql").render_as_string(hide_password=False))
+    if kind != "local":
+        raise ValueError(f"Unknown LIVE_BROKER '{kind}' (expected 'local' or 'postgres')")
+    return LocalBroker()
+
+
+def format_event(event: str, data) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+
+async def survey_event_stream(survey_id: int, load_snapshot):
+    """
+    SSE body for one dashboard: a 'snapshot' event from `load_snapshot()` first,
+    then a 'delta' event per change. A 'snapshot' is sent again after a resync.
+    """
+    queue = broker.subscribe(survey_id)
+    try:
+        yield format_event("snapshot", await load_snapshot())
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield b": keepalive\n\n"
+                continue
+            if event is CLOSED:
+                return
+            if event is RESYNC:
+                yield format_event("snapshot", await load_snapshot())
+            else:
+                yield format_event("delta", event)
+    finally:
+        broker.unsubscribe(survey_id, queue)
+
+
+broker = create_broker()
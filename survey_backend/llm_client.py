@@ -0,0 +1,260 @@
+"""
+Chat-completions client with timeouts, jittered retries, a concurrency cap and a circuit breaker.
+Giving up raises LLMUnavailable (or the final API error).
+"""
+import os
+import time
+import random
+import asyncio
+import threading
+import httpx
+import openai
+from openai import OpenAI, AsyncOpenAI
+
+# ==============================
+# CONFIGURATION
+# ==============================
+LLM_CONNECT_TIMEOUT_SECONDS = float(os.getenv("LLM_CONNECT_TIMEOUT_SECONDS", "3"))
+LLM_READ_TIMEOUT_SECONDS = float(os.getenv("LLM_READ_TIMEOUT_SECONDS", "20"))
+LLM_DEADLINE_SECONDS = float(os.getenv("LLM_DEADLINE_SECONDS", "45"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+LLM_KEEPALIVE_SECONDS = 30.0
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_RETRY_BASE_SECONDS = 0.5
+LLM_RETRY_CAP_SECONDS = 8.0
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "8"))
+LLM_QUEUE_TIMEOUT_SECONDS = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "10"))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("LLM_BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+
+RETRYABLE_STATUS = frozenset({429, 500, 502, 503, 504})
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class LLMUnavailable(Exception):
+    """The call was not made: the breaker is open or no slot freed up in time."""
+
+
+def _retryable(error: Exception) -> bool:
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in RETRYABLE_STATUS
+    return isinstance(error, (openai.APIConnectionError, httpx.TransportError))
+
+
+def _retry_after(error: Exception):
+    response = getattr(error, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def backoff_seconds(attempt: int, error: Exception = None) -> float:
+    """Full-jitter exponential backoff; a Retry-After header sets the minimum."""
+    delay = random.uniform(0, min(LLM_RETRY_CAP_SECONDS, LLM_RETRY_BASE_SECONDS * 2 ** attempt))
+    retry_after = _retry_after(error) if error is not None else None
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, LLM_RETRY_CAP_SECONDS))
+    return delay
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker shared by the sync and async paths (thread-safe)."""
+
+    def __init__(self, failure_threshold: int = BREAKER_FAILURE_THRESHOLD, reset_seconds: float = BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self.transitions = {CLOSED: 0, OPEN: 0, HALF_OPEN: 0}
+        self._lock = threading.Lock()
+
+    def _move(self, state: str) -> None:
+        if state != self.state:
+            self.state = state
+            self.transitions[state] += 1
+
+    def allow(self) -> tuple:
+        """(allowed, state the call was admitted in). Only one probe at a time while half-open."""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_seconds:
+                self._move(HALF_OPEN)
+            if self.state == CLOSED:
+                return True, CLOSED
+            if self.state == HALF_OPEN and not self.probing:
+                self.probing = True
+                return True, HALF_OPEN
+            return False, self.state
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.consecutive_failures = 0
+            self.probing = False
+            self._move(CLOSED)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                self._move(OPEN)
+            self.probing = False
+
+    def release_probe(self) -> None:
+        """Free the half-open probe slot when a call ended without a verdict (e.g. a 400)."""
+        with self._lock:
+            self.probing = False
+
+
+class ResilientLLMClient:
+    """
+    complete() / acomplete() take chat.completions.create() keyword arguments. acomplete() also
+    takes a `before_request` coroutine function, awaited before every attempt, retries included.
+    """
+
+    def __init__(self, api_key: str, base_url: str, breaker: CircuitBreaker = None):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.timeout = httpx.Timeout(LLM_READ_TIMEOUT_SECONDS, connect=LLM_CONNECT_TIMEOUT_SECONDS)
+        self.limits = httpx.Limits(max_connections=LLM_MAX_CONNECTIONS, max_keepalive_connections=LLM_MAX_CONNECTIONS,
+                                   keepalive_expiry=LLM_KEEPALIVE_SECONDS)
+        # Retries are ours (jittered, deadline-aware), so the SDK's own are off
+        self.client = OpenAI(api_key=api_key, base_url=base_url, timeout=self.timeout, max_retries=0,
+                             http_client=httpx.Client(timeout=self.timeout, limits=self.limits))
+        self.breaker = breaker or CircuitBreaker()
+        self._slots = threading.BoundedSemaphore(LLM_CONCURRENCY)
+        self._loop = None
+        self._async_client = None
+        self._async_slots = None
+        self._lock = threading.Lock()
+        self.counters = {
+            "calls": 0, "succeeded": 0, "failed": 0, "retries": 0, "timeouts": 0,
+            "rejected_open": 0, "rejected_busy": 0, "in_flight": 0,
+        }
+        self.calls_by_state = {CLOSED: 0, OPEN: 0, HALF_OPEN: 0}
+
+    def _async_parts(self) -> tuple:
+        """Async client and slots for the running loop; pooled connections cannot outlive their loop."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._async_client = AsyncOpenAI(
+                api_key=self.api_key, base_url=self.base_url, timeout=self.timeout, max_retries=0,
+                http_client=httpx.AsyncClient(timeout=self.timeout, limits=self.limits),
+            )
+            self._async_slots = asyncio.Semaphore(LLM_CONCURRENCY)
+        return self._async_client, self._async_slots
+
+    def _count(self, key: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[key] += n
+
+    def _admit(self) -> str:
+        allowed, state = self.breaker.allow()
+        with self._lock:
+            self.calls_by_state[state] += 1
+            self.counters["calls"] += 1
+        if not allowed:
+            self._count("rejected_open")
+            raise LLMUnavailable("LLM circuit breaker is open")
+        return state
+
+    def _should_retry(self, error: Exception, attempt: int, started: float) -> float:
+        """Seconds to wait before retrying, or None to give up."""
+        if isinstance(error, openai.APITimeoutError):
+            self._count("timeouts")
+        if not _retryable(error) or attempt >= LLM_MAX_RETRIES:
+            return None
+        delay = backoff_seconds(attempt, error)
+        if time.monotonic() - started + delay + LLM_READ_TIMEOUT_SECONDS > LLM_DEADLINE_SECONDS:
+            return None
+        self._count("retries")
+        return delay
+
+    def _finish(self, error: Exception = None) -> None:
+        if error is None:
+            self.breaker.record_success()
+            self._count("succeeded")
+        elif _retryable(error):
+            self.breaker.record_failure()
+            self._count("failed")
+        else:
+            # The provider answered; a bad request says nothing about its health
+            self.breaker.release_probe()
+            self._count("failed")
+
+    def complete(self, **request):
+        self._admit()
+        if not self._slots.acquire(timeout=LLM_QUEUE_TIMEOUT_SECONDS):
+            self.breaker.release_probe()
+            self._count("rejected_busy")
+            raise LLMUnavailable("Too many LLM calls in flight")
+        self._count("in_flight")
+        started = time.monotonic()
+        try:
+            attempt = 0
+            while True:
+                try:
+                    response = self.client.chat.completions.create(**request)
+                except Exception as e:
+                    delay = self._should_retry(e, attempt, started)
+                    if delay is None:
+                        self._finish(e)
+                        raise
+                    attempt += 1
+                    time.sleep(delay)
+                    continue
+                self._finish()
+                return response
+        finally:
+            self._count("in_flight", -1)
+            self._slots.release()
+
+    async def acomplete(self, before_request=None, **request):
+        if before_request is not None:
+            await before_request()
+        async_client, slots = self._async_parts()
+        self._admit()
+        try:
+            await asyncio.wait_for(slots.acquire(), LLM_QUEUE_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            self.breaker.release_probe()
+            self._count("rejected_busy")
+            raise LLMUnavailable("Too many LLM calls in flight")
+        self._count("in_flight")
+        started = time.monotonic()
+        try:
+            attempt = 0
+            while True:
+                try:
+                    response = await async_client.chat.completions.create(**request)
+                except Exception as e:
+                    delay = self._should_retry(e, attempt, started)
+                    if delay is None:
+                        self._finish(e)
+                        raise
+                    attempt += 1
+                    await asyncio.sleep(delay)
+                    if before_request is not None:
+                        await before_request()
+                    continue
+                self._finish()
+                return response
+        finally:
+            self._count("in_flight", -1)
+            slots.release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.counters)
+            stats["calls_by_state"] = dict(self.calls_by_state)
+        stats["breaker"] = {
+            "state": self.breaker.state,
+            "consecutive_failures": self.breaker.consecutive_failures,
+            "transitions": dict(self.breaker.transitions),
+        }
+        return stats
@@ -1,76 +1,55 @@
-from fastapi import FastAPI, HTTPException, Depends, status
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Depends, Request, Response, status
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
+from fastapi.responses import StreamingResponse, JSONResponse
+from starlette.concurrency import run_in_threadpool
 from starlette.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, constr, field_validator, model_validator
 from typing import List, Optional, Dict, Annotated
-from sqlalchemy import create_engine, Column, Integer, String, Boolean, ForeignKey, Text
-from sqlalchemy.orm import sessionmaker, declarative_base, relationship, Session
-from passlib.context import CryptContext
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 import jwt
 import json
 from pydantic import constr
+import threading
 from datetime import datetime, timedelta
-from perplexityai_analysis import analyze_submission
+from database import Base, engine, read_engine, AsyncSessionLocal, AsyncReadSessionLocal, get_db, get_read_db
+from storage import storage_info
+from migrations import run_migrations
+from models import User, Survey, SurveyAssignment, SurveyResponse, AnalysisJob
+from analysis_worker import enqueue_analysis, worker_pool
+from analysis_cache import analysis_cache
+from perplexityai_analysis import routing_stats, token_stats, llm
+from aggregates import record_response, get_distribution, get_trend, ensure_aggregates, UNKNOWN_LABEL
+from password_hashing import hash_pool, HashPoolSaturated
+from bulk_import import import_users
+from assignments import resolve_target_users, sync_assignments
+from export import stream_ndjson, stream_csv
+from pagination import paginate, parse_fields, NEXT_CURSOR_HEADER
+from term_index import index_response_terms, top_terms, ensure_term_index
+from answers import store_answers, ensure_answers, question_stats, label_by_question
+from serialization import FastJSONResponse, select_responses, response_rows, report_rows
+from compression import CompressionMiddleware
+from live_updates import broker, new_delta, survey_event_stream
+from data_versions import (
+    ETAG_HEADER, CACHE_CONTROL, bump_survey_versions, survey_version, survey_list_version,
+    make_etag, etag_matches, not_modified, set_etag,
+)
 
 # ==============================
 # CONFIGURATION
 # ==============================
-DATABASE_URL = "sqlite:///./survey_app.db"
 SECRET_KEY = "your-secret-key"  # Change this in production
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
-Base = declarative_base()
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+# EventSource cannot send headers, so streaming endpoints also accept ?access_token=
+oauth2_scheme_optional = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
 
-# ==============================
-# DATABASE MODELS
-# ==============================
-class User(Base):
-    __tablename__ = "users"
-    id = Column(Integer, primary_key=True, index=True)
-    username = Column(String, unique=True, index=True, nullable=False)
-    hashed_password = Column(String, nullable=False)
-    role = Column(String, nullable=False)  # 'admin' or 'employee'
-
-
-class Survey(Base):
-    __tablename__ = "surveys"
-    id = Column(Integer, primary_key=True, index=True)
-    title = Column(String, nullable=False)
-    questions = Column(Text)  # Stored as JSON string
-    published = Column(Boolean, default=False)
-
-
-class SurveyAssignment(Base):
-    __tablename__ = "survey_assignments"
-    id = Column(Integer, primary_key=True, index=True)
-    survey_id = Column(Integer, ForeignKey("surveys.id"))
-    user_id = Column(Integer, ForeignKey("users.id"))
-
-    survey = relationship("Survey")
-    user = relationship("User")
-
-
-class SurveyResponse(Base):
-    __tablename__ = "survey_responses"
-    id = Column(Integer, primary_key=True, index=True)
-    survey_id = Column(Integer, ForeignKey("surveys.id"))
-    user_id = Column(Integer, ForeignKey("users.id"))
-    answers = Column(Text)  # JSON string of answers
-    sentiment = Column(String, nullable=True)
-    burnout_risk = Column(String, nullable=True)
-
-    survey = relationship("Survey")
-    user = relationship("User")
-
-
-# Create all tables
+# Create all tables, then bring existing databases up to the current schema
 Base.metadata.create_all(bind=engine)
+run_migrations(engine)
 
 # ==============================
 # PYDANTIC SCHEMAS
@@ -93,6 +72,13 @@ class Token(BaseModel):
     token_type: str
 
 
+class CurrentUser(BaseModel):
+    """Authenticated principal resolved from token claims alone (no DB lookup)."""
+    id: int
+    username: str
+    role: str
+
+
 class UserOut(BaseModel):
     username: str
     role: str
@@ -124,7 +110,8 @@ class SurveyOut(BaseModel):
 
 class SurveyAssignmentCreate(BaseModel):
     survey_id: int
-    user_ids: List[int]
+    user_ids: List[int] = []
+    roles: List[str] = []  # e.g. ["employee"] assigns everyone with that role
 
 
 class SurveyResponseCreate(BaseModel):
@@ -139,6 +126,8 @@ class SurveyResponseOut(BaseModel):
     answers: Dict[str, str]
     sentiment: Optional[str]
     burnout_risk: Optional[str]
+    submitted_at: Optional[datetime] = None
+    analysis_status: Optional[str] = None
 
     class Config:
         from_attributes = True
@@ -156,6 +145,15 @@ class SurveyResponseOut(BaseModel):
         return data
 
 
+class AnalysisStatusOut(BaseModel):
+    response_id: int
+    status: str
+    attempts: int
+    sentiment: Optional[str]
+    burnout_risk: Optional[str]
+    result: Optional[str] = None  # analyzed, fallback or failed once the job has finished
+
+
 class SurveyReportRow(BaseModel):
     response_id: int
     user_id: int
@@ -167,18 +165,26 @@ class SurveyReportRow(BaseModel):
 # ==============================
 # UTILITY FUNCTIONS
 # ==============================
-def get_password_hash(password: str) -> str:
-    safe_password = password
-    while len(safe_password.encode("utf-8")) > 72:
-        safe_password = safe_password[:-1]
-    return pwd_context.hash(safe_password)
+class TokenRevocations:
+    """Per-user token versions; bumping one invalidates older tokens. State is per process."""
+
+    def __init__(self):
+        self._versions: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def current(self, user_id: int) -> int:
+        return self._versions.get(user_id, 0)
+
+    def revoke(self, user_id: int) -> int:
+        with self._lock:
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+            return self._versions[user_id]
 
+    def is_valid(self, user_id: int, version: int) -> bool:
+        return version >= self._versions.get(user_id, 0)
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    safe_password = plain_password
-    while len(safe_password.encode("utf-8")) > 72:
-        safe_password = safe_password[:-1]
-    return pwd_context.verify(safe_password, hashed_password)
+
+token_revocations = TokenRevocations()
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -188,30 +194,41 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+def create_user_access_token(user: User) -> str:
+    return create_access_token(data={
+        "sub": user.username,
+        "uid": user.id,
+        "role": user.role,
+        "ver": token_revocations.current(user.id),
+    })
 
 
-def get_user(db: Session, username: str):
-    return db.query(User).filter(User.username == username).first()
+async def get_user(db: AsyncSession, username: str):
+    result = await db.execute(select(User).where(User.username == username))
+    return result.scalars().first()
 
 
-def get_users_by_role(db: Session, role: str):
-    return db.query(User).filter(User.role == role).all()
+async def get_users_by_role(db: AsyncSession, role: str):
+    result = await db.execute(select(User).where(User.role == role))
+    return result.scalars().all()
 
 
-def authenticate_user(db: Session, username: str, password: str):
-    user = get_user(db, username)
-    if not user or not verify_password(password, user.hashed_password):
+async def authenticate_user(db: AsyncSession, username: str, password: str):
+    user = await get_user(db, username)
+    if not user or not await hash_pool.verify(password, user.hashed_password):
         return False
     return user
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+def hash_pool_unavailable() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Authentication service is busy, please retry shortly",
+        headers={"Retry-After": "1"},
+    )
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> CurrentUser:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -220,24 +237,61 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
-        if username is None:
+        user_id = payload.get("uid")
+        role = payload.get("role")
+        if username is None or user_id is None or role is None:
             raise credentials_exception
     except jwt.PyJWTError:
         raise credentials_exception
-    user = get_user(db, username)
-    if user is None:
+    if not token_revocations.is_valid(user_id, payload.get("ver", 0)):
         raise credentials_exception
-    return user
+    return CurrentUser(id=user_id, username=username, role=role)
+
+
+async def get_stream_user(
+    header_token: Optional[str] = Depends(oauth2_scheme_optional),
+    access_token: Optional[str] = None,
+) -> CurrentUser:
+    token = header_token or access_token
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return await get_current_user(token)
 
 
-async def get_current_active_user(current_user: User = Depends(get_current_user)):
+async def get_current_active_user(current_user: CurrentUser = Depends(get_current_user)):
     return current_user
 
 
+async def survey_etag(db: AsyncSession, survey_id: int, scope: str, request: Request) -> str:
+    """ETag for a per-survey resource; raises 404 if the survey does not exist."""
+    version = await survey_version(db, survey_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Survey not found")
+    return make_etag(f"{scope}:{survey_id}", version, request)
+
+
 # ==============================
 # FASTAPI INITIALIZATION
 # ==============================
-app = FastAPI(title="Employee Survey System", version="1.1")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    async with AsyncSessionLocal() as db:
+        await db.run_sync(ensure_aggregates)
+        await db.run_sync(ensure_term_index)
+        await db.run_sync(ensure_answers)
+    await broker.start()
+    await worker_pool.start()
+    yield
+    await worker_pool.stop()
+    await broker.stop()
+    hash_pool.shutdown()
+
+
+app = FastAPI(title="Employee Survey System", version="1.1", lifespan=lifespan)
 
 # ==============================
 # CORS CONFIGURATION (UPDATED)
@@ -255,43 +309,90 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, ETAG_HEADER],
 )
+app.add_middleware(CompressionMiddleware)
 
 # ==============================
 # ROUTES
 # ==============================
 @app.get("/health")
-def health_check():
+async def health_check():
     return {"status": "ok", "time": datetime.utcnow().isoformat()}
 
 
 @app.post("/users/", status_code=201)
-def create_user(user_in: UserCreate, db: Session = Depends(get_db)):
-    existing_user = get_user(db, user_in.username)
+async def create_user(user_in: UserCreate, db: AsyncSession = Depends(get_db)):
+    existing_user = await get_user(db, user_in.username)
     if existing_user:
         raise HTTPException(status_code=400, detail="Username already registered")
-    hashed_password = get_password_hash(user_in.password)
+    try:
+        hashed_password = await hash_pool.hash(user_in.password)
+    except HashPoolSaturated:
+        raise hash_pool_unavailable()
     user = User(username=user_in.username, hashed_password=hashed_password, role=user_in.role)
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
     return {"username": user.username, "role": user.role}
 
 
+@app.post("/users/bulk-import")
+async def bulk_import_users(
+    request: Request,
+    format: Optional[str] = None,
+    current_user: CurrentUser = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Import users from a CSV (username,password,role header) or NDJSON request body.
+    Returns a per-row error report; valid rows are imported even if others fail.
+    """
+    if current_user.role.lower() != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    content_type = request.headers.get("content-type", "")
+    fmt = (format or ("ndjson" if "ndjson" in content_type or "jsonlines" in content_type else "csv")).lower()
+    if fmt not in ("csv", "ndjson"):
+        raise HTTPException(status_code=400, detail="format must be 'csv' or 'ndjson'")
+
+    try:
+        return await import_users(db, request.stream(), fmt, UserCreate)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @app.post("/token", response_model=Token)
-def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = authenticate_user(db, form_data.username, form_data.password)
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
+    try:
+        user = await authenticate_user(db, form_data.username, form_data.password)
+    except HashPoolSaturated:
+        raise hash_pool_unavailable()
     if not user:
         raise HTTPException(status_code=400, detail="Incorrect username or password")
-    access_token = create_access_token(data={"sub": user.username})
+    access_token = create_user_access_token(user)
     return {"access_token": access_token, "token_type": "bearer"}
 
 
+@app.get("/auth/hash-pool-stats")
+async def get_hash_pool_stats(current_user: CurrentUser = Depends(get_current_active_user)):
+    if current_user.role.lower() != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return hash_pool.stats()
+
+
+@app.post("/users/{user_id}/revoke-tokens")
+async def revoke_user_tokens(user_id: int, current_user: CurrentUser = Depends(get_current_active_user)):
+    if current_user.role.lower() != "admin" and current_user.id != user_id:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    token_revocations.revoke(user_id)
+    return {"detail": "Tokens revoked"}
+
+
 @app.post("/surveys/", response_model=SurveyOut)
-def create_survey(
+async def create_survey(
     survey_in: SurveyCreate,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
 ):
     if current_user.role.lower() != "admin":
         raise HTTPException(status_code=403, detail="Not authorized")
@@ -302,191 +403,427 @@ def create_survey(
         published=False,
     )
     db.add(survey)
-    db.commit()
-    db.refresh(survey)
-    survey.questions = survey_in.questions
-    return survey
+    await db.commit()
+    return SurveyOut(id=survey.id, title=survey.title, questions=survey_in.questions, published=False)
+
+
+SURVEY_FIELDS = ("id", "title", "questions", "published")
+EMPLOYEE_FIELDS = ("id", "username", "role")
 
 
 @app.get("/surveys/", response_model=List[SurveyOut])
-def get_surveys(current_user: User = Depends(get_current_active_user), db: Session = Depends(get_db)):
-    surveys = db.query(Survey).all()
-    for s in surveys:
-        s.questions = json.loads(s.questions)
-    return surveys
+async def get_surveys(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    published: Optional[bool] = None,
+    title_prefix: Optional[str] = None,
+    fields: Optional[str] = None,
+    current_user: CurrentUser = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    List surveys, paged by `limit`/`cursor` (next cursor in X-Next-Cursor).
+    `fields=id,title` skips loading questions; If-None-Match gets a 304 while nothing changed.
+    """
+    etag = make_etag("surveys", await survey_list_version(db), request)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    selected = parse_fields(fields, SURVEY_FIELDS)
+    columns = [getattr(Survey, field) for field in selected] if selected else [Survey]
+    stmt = select(*columns)
+    if published is not None:
+        stmt = stmt.where(Survey.published == published)
+    if title_prefix:
+        stmt = stmt.where(Survey.title.startswith(title_prefix, autoescape=True))
+    rows, next_cursor = await paginate(db, stmt, Survey.id, cursor, limit, scalars=not selected)
+
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
+    headers.update({ETAG_HEADER: etag, "Cache-Control": CACHE_CONTROL})
+    if selected:
+        items = []
+        for row in rows:
+            item = dict(zip(selected, row))
+            if "questions" in item:
+                item["questions"] = json.loads(item["questions"] or "[]")
+            items.append(item)
+        return JSONResponse(items, headers=headers)
+
+    response.headers.update(headers)
+    return [
+        SurveyOut(id=s.id, title=s.title, questions=json.loads(s.questions or "[]"), published=bool(s.published))
+        for s in rows
+    ]
 
 
 @app.post("/survey-assignments/")
-def assign_survey(
+async def assign_survey(
     assign_in: SurveyAssignmentCreate,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
 ):
     if current_user.role.lower() != "admin":
         raise HTTPException(status_code=403, detail="Not authorized")
 
-    survey = db.query(Survey).filter(Survey.id == assign_in.survey_id).first()
+    survey = await db.get(Survey, assign_in.survey_id)
     if not survey:
         raise HTTPException(status_code=404, detail="Survey not found")
 
-    db.query(SurveyAssignment).filter(SurveyAssignment.survey_id == assign_in.survey_id).delete()
-
-    for user_id in assign_in.user_ids:
-        if db.query(User).filter(User.id == user_id).first():
-            db.add(SurveyAssignment(survey_id=assign_in.survey_id, user_id=user_id))
+    target_user_ids, invalid_user_ids = await db.run_sync(resolve_target_users, assign_in.user_ids, assign_in.roles)
+    changes = await db.run_sync(sync_assignments, assign_in.survey_id, target_user_ids)
 
     survey.published = True
-    db.commit()
-    return {"detail": "Survey assigned successfully"}
+    await db.run_sync(bump_survey_versions, [survey.id])
+    await db.commit()
+    return {"detail": "Survey assigned successfully", **changes, "invalid_user_ids": invalid_user_ids}
 
 
 @app.post("/survey-responses/")
-def submit_response(
+async def submit_response(
     response_in: SurveyResponseCreate,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    assignment = db.query(SurveyAssignment).filter(
+    assignment = (await db.execute(select(SurveyAssignment.id).where(
         SurveyAssignment.survey_id == response_in.survey_id,
         SurveyAssignment.user_id == current_user.id
-    ).first()
+    ))).first()
 
     if not assignment:
         raise HTTPException(status_code=403, detail="User not assigned to this survey")
 
-    ai_results = analyze_submission(
-        submission_id=response_in.survey_id,
-        responses=response_in.answers
-    )
-
-    if not ai_results or "analysis" not in ai_results:
-        sentiment = ai_results.get("sentiment", "Neutral")
-        burnout_risk = ai_results.get("burnout_risk", "Low")
-    else:
-        sentiment = ai_results["analysis"].get("emotional_tone", "Neutral")
-        burnout_risk = ai_results["analysis"].get("burnout_risk", "Low")
-
     answers_json = json.dumps(response_in.answers)
     resp = SurveyResponse(
         survey_id=response_in.survey_id,
         user_id=current_user.id,
         answers=answers_json,
-        sentiment=sentiment,
-        burnout_risk=burnout_risk
+        sentiment=None,
+        burnout_risk=None,
+        submitted_at=datetime.utcnow(),
+        analysis_status="pending"
     )
     db.add(resp)
-    db.commit()
-    db.refresh(resp)
-    return {"detail": "Response submitted successfully"}
+    await db.flush()
+    await db.run_sync(record_response, resp.survey_id, None, None, resp.submitted_at)
+    await db.run_sync(index_response_terms, resp.survey_id, response_in.answers)
+    await db.run_sync(store_answers, resp.id, resp.survey_id, response_in.answers)
+    await db.run_sync(bump_survey_versions, [resp.survey_id])
+    enqueue_analysis(db, resp.id)
+    await db.commit()
+    worker_pool.notify()
+
+    delta = new_delta(resp.survey_id)
+    delta["total"] = 1
+    delta["sentiment"][UNKNOWN_LABEL] = delta["burnout_risk"][UNKNOWN_LABEL] = 1
+    try:
+        await broker.publish([delta])
+    except Exception as e:
+        print(f"Live update publish failed: {e}")
+    return {"detail": "Response submitted successfully", "response_id": resp.id, "analysis_status": "pending"}
+
+
+@app.get("/survey-responses/{response_id}/analysis", response_model=AnalysisStatusOut)
+async def get_response_analysis_status(
+    response_id: int,
+    current_user: CurrentUser = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    resp = await db.get(SurveyResponse, response_id)
+    if not resp:
+        raise HTTPException(status_code=404, detail="Response not found")
+    if current_user.role.lower() != "admin" and resp.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    job = (await db.execute(select(AnalysisJob).where(AnalysisJob.response_id == response_id))).scalars().first()
+    # Responses stored before the job queue existed were analyzed inline
+    analysis_status = job.status if job else "done"
+    return AnalysisStatusOut(
+        response_id=resp.id,
+        status=analysis_status,
+        attempts=job.attempts if job else 0,
+        sentiment=resp.sentiment,
+        burnout_risk=resp.burnout_risk,
+        result=resp.analysis_status
+    )
 
 
 @app.get("/survey-responses/{survey_id}", response_model=List[SurveyResponseOut])
-def get_survey_results(
+async def get_survey_results(
     survey_id: int,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_read_db)
 ):
     if current_user.role.lower() != "admin":
         raise HTTPException(status_code=403, detail="Not authorized")
-    responses = db.query(SurveyResponse).filter(SurveyResponse.survey_id == survey_id).all()
-    if not responses:
-        if not db.query(Survey).filter(Survey.id == survey_id).first():
+    rows = (await db.execute(select_responses(survey_id))).all()
+    if not rows:
+        if not await db.get(Survey, survey_id):
             raise HTTPException(status_code=404, detail="Survey not found")
-        return []
-    return responses
+    # Trusted rows from our own table: skip response_model validation
+    return FastJSONResponse(response_rows(rows))
+
+
+@app.get("/survey-responses/{survey_id}/export")
+async def export_survey_results(
+    survey_id: int,
+    format: str = "ndjson",
+    current_user: CurrentUser = Depends(get_current_active_user)
+):
+    if current_user.role.lower() != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized")
+    if format not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'csv'")
+    # No request-scoped session: it would hold a pooled connection until the export finishes
+    async with AsyncReadSessionLocal() as db:
+        if not await db.get(Survey, survey_id):
+            raise HTTPException(status_code=404, detail="Survey not found")
+
+    if format == "csv":
+        body, media_type = stream_csv(AsyncReadSessionLocal, survey_id), "text/csv"
+    else:
+        body, media_type = stream_ndjson(AsyncReadSessionLocal, survey_id), "application/x-ndjson"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="survey_{survey_id}_responses.{format}"'},
+    )
 
 
 @app.get("/users/me", response_model=UserOut)
-async def read_users_me(current_user: Annotated[User, Depends(get_current_active_user)]):
+async def read_users_me(current_user: Annotated[CurrentUser, Depends(get_current_active_user)]):
     return current_user
 
 
 @app.get("/employees/", response_model=List[Employee])
-async def read_employees(db: Session = Depends(get_db), current_user: dict = Depends(get_current_active_user)):
-    employees = get_users_by_role(db=db, role="employee")
+async def read_employees(
+    response: Response,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    role: str = "employee",
+    username_prefix: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
+):
+    selected = parse_fields(fields, EMPLOYEE_FIELDS)
+    columns = [getattr(User, field) for field in selected] if selected else [User]
+    stmt = select(*columns).where(User.role == role)
+    if username_prefix:
+        stmt = stmt.where(User.username.startswith(username_prefix, autoescape=True))
+    employees, next_cursor = await paginate(db, stmt, User.id, cursor, limit, scalars=not selected)
+
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
+    if selected:
+        return JSONResponse([dict(zip(selected, row)) for row in employees], headers=headers)
+    response.headers.update(headers)
     return employees or []
 
 
+@app.get("/admin/storage")
+async def get_storage_info(current_user: CurrentUser = Depends(get_current_active_user)):
+    if current_user.role.lower() != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return {
+        "primary": await run_in_threadpool(storage_info, engine),
+        "read": await run_in_threadpool(storage_info, read_engine),
+    }
+
+
+@app.get("/analysis/cache-stats")
+async def get_analysis_cache_stats(current_user: CurrentUser = Depends(get_current_active_user)):
+    if current_user.role.lower() != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized")
+    # stats() takes the lock the cache holds during sqlite I/O
+    return {**(await run_in_threadpool(analysis_cache.stats)), "routing": routing_stats()}
+
+
+@app.get("/analysis/llm-stats")
+async def get_llm_stats(current_user: CurrentUser = Depends(get_current_active_user)):
+    if current_user.role.lower() != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return {**llm.stats(), "tokens": token_stats()}
+
+
 @app.get("/analysis/survey/{survey_id}/distribution")
-def get_survey_distribution(
+async def get_survey_distribution(
     survey_id: int,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    current_user: CurrentUser = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_read_db)
 ):
     if current_user.role.lower() != "admin":
         raise HTTPException(status_code=403, detail="Not authorized")
 
-    survey = db.query(Survey).filter(Survey.id == survey_id).first()
-    if not survey:
-        raise HTTPException(status_code=404, detail="Survey not found")
-
-    responses = db.query(SurveyResponse).filter(SurveyResponse.survey_id == survey_id).all()
-
-    sentiment_counts, burnout_counts = {}, {}
-    for r in responses:
-        sentiment = r.sentiment or "Unknown"
-        burnout = r.burnout_risk or "Unknown"
-        sentiment_counts[sentiment] = sentiment_counts.get(sentiment, 0) + 1
-        burnout_counts[burnout] = burnout_counts.get(burnout, 0) + 1
+    etag = await survey_etag(db, survey_id, "distribution", request)
+    if etag_matches(request, etag):
+        return not_modified(etag)
 
+    distribution = await db.run_sync(get_distribution, survey_id)
+    set_etag(response, etag)
     return {
-        "sentiment_distribution": [{"label": k, "value": v} for k, v in sentiment_counts.items()],
-        "burnout_risk_distribution": [{"label": k, "value": v} for k, v in burnout_counts.items()],
-        "total_responses": len(responses),
+        "sentiment_distribution": distribution["sentiment"],
+        "burnout_risk_distribution": distribution["burnout_risk"],
+        "total_responses": sum(item["value"] for item in distribution["sentiment"]),
     }
 
 
-@app.get("/analysis/survey/{survey_id}/text-data")
-def get_survey_text_data(
+@app.get("/analysis/survey/{survey_id}/events")
+async def stream_survey_events(
     survey_id: int,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_stream_user)
 ):
+    """
+    Server-Sent Events for a live dashboard: one 'snapshot' event with the full
+    distribution, then a 'delta' event for each stored response or finished analysis.
+    """
     if current_user.role.lower() != "admin":
         raise HTTPException(status_code=403, detail="Not authorized")
 
-    responses = db.query(SurveyResponse).filter(SurveyResponse.survey_id == survey_id).all()
-    if not responses:
-        if not db.query(Survey).filter(Survey.id == survey_id).first():
+    # No request-scoped session: it would hold a pooled connection for the life of the stream
+    async with AsyncReadSessionLocal() as db:
+        if not await db.get(Survey, survey_id):
             raise HTTPException(status_code=404, detail="Survey not found")
-        return {"all_answers_text": ""}
 
-    text_list = []
-    for resp in responses:
-        try:
-            answers = json.loads(resp.answers)
-            text_list.extend(str(v) for v in answers.values() if isinstance(v, str))
-        except json.JSONDecodeError:
-            continue
+    async def load_snapshot():
+        # Own short-lived session: the stream outlives the request's dependency session
+        async with AsyncReadSessionLocal() as snapshot_db:
+            distribution = await snapshot_db.run_sync(get_distribution, survey_id)
+        return {
+            "survey_id": survey_id,
+            "sentiment_distribution": distribution["sentiment"],
+            "burnout_risk_distribution": distribution["burnout_risk"],
+            "total_responses": sum(item["value"] for item in distribution["sentiment"]),
+        }
+
+    return StreamingResponse(
+        survey_event_stream(survey_id, load_snapshot),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/analysis/survey/{survey_id}/trend")
+async def get_survey_trend(
+    survey_id: int,
+    request: Request,
+    response: Response,
+    granularity: str = "day",
+    dimension: str = "sentiment",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    current_user: CurrentUser = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Label counts per hour or day bucket (UTC), read from the pre-bucketed rollups only."""
+    if current_user.role.lower() != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    etag = await survey_etag(db, survey_id, "trend", request)
+    if etag_matches(request, etag):
+        return not_modified(etag)
 
-    return {"all_answers_text": " ".join(text_list)}
+    try:
+        buckets = await db.run_sync(get_trend, survey_id, granularity, dimension, start, end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    set_etag(response, etag)
+    return {"granularity": granularity, "dimension": dimension, "buckets": buckets}
 
 
-@app.get("/analysis/survey/{survey_id}/report-table", response_model=List[SurveyReportRow])
-def get_survey_report_table(
+@app.get("/analysis/survey/{survey_id}/text-data")
+async def get_survey_text_data(
     survey_id: int,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    top_k: int = 100,
+    current_user: CurrentUser = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_read_db)
 ):
+    """Top-K terms (words and bigrams, stopwords removed) for the survey's word cloud."""
     if current_user.role.lower() != "admin":
         raise HTTPException(status_code=403, detail="Not authorized")
 
-    results = db.query(SurveyResponse, User.username).join(User, SurveyResponse.user_id == User.id).filter(
-        SurveyResponse.survey_id == survey_id
-    ).all()
+    etag = await survey_etag(db, survey_id, "text-data", request)
+    if etag_matches(request, etag):
+        return not_modified(etag)
 
-    if not results:
-        if not db.query(Survey).filter(Survey.id == survey_id).first():
-            raise HTTPException(status_code=404, detail="Survey not found")
-        return []
+    terms = await db.run_sync(top_terms, survey_id, top_k)
+    set_etag(response, etag)
+    return {"terms": terms}
 
-    return [
-        SurveyReportRow(
-            response_id=r.id,
-            user_id=r.user_id,
-            username=username,
-            sentiment=r.sentiment,
-            burnout_risk=r.burnout_risk
-        )
-        for r, username in results
-    ]
+
+@app.get("/analysis/survey/{survey_id}/questions")
+async def get_survey_question_stats(
+    survey_id: int,
+    request: Request,
+    response: Response,
+    current_user: CurrentUser = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Per-question response counts and answer length stats."""
+    if current_user.role.lower() != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    etag = await survey_etag(db, survey_id, "questions", request)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    questions = await db.run_sync(question_stats, survey_id)
+    set_etag(response, etag)
+    return {"questions": questions}
+
+
+@app.get("/analysis/survey/{survey_id}/questions/labels")
+async def get_survey_question_labels(
+    survey_id: int,
+    request: Request,
+    response: Response,
+    dimension: str = "sentiment",
+    current_user: CurrentUser = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Sentiment (or burnout_risk) distribution of the responses that answered each question."""
+    if current_user.role.lower() != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    etag = await survey_etag(db, survey_id, "question-labels", request)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    try:
+        questions = await db.run_sync(label_by_question, survey_id, dimension)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    set_etag(response, etag)
+    return {"questions": questions}
+
+
+@app.get("/analysis/survey/{survey_id}/report-table", response_model=List[SurveyReportRow])
+async def get_survey_report_table(
+    survey_id: int,
+    request: Request,
+    current_user: CurrentUser = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    if current_user.role.lower() != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    etag = await survey_etag(db, survey_id, "report-table", request)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    results = (await db.execute(
+        select(
+            SurveyResponse.id, SurveyResponse.user_id, User.username,
+            SurveyResponse.sentiment, SurveyResponse.burnout_risk,
+        ).join(User, SurveyResponse.user_id == User.id).where(
+            SurveyResponse.survey_id == survey_id
+        ).order_by(SurveyResponse.id)
+    )).all()
+
+    fast_response = FastJSONResponse(report_rows(results))
+    set_etag(fast_response, etag)
+    return fast_response
@@ -0,0 +1,127 @@
+import json
+import time
+import asyncio
+import argparse
+from database import Base, engine, SessionLocal
+import models  # noqa: F401  (registers tables on Base.metadata)
+from aggregates import rebuild_aggregates
+from migrations import run_migrations, explain_endpoints
+from term_index import rebuild_term_index
+from answers import backfill_answers
+
+
+def cmd_rebuild_aggregates(args) -> None:
+    db = SessionLocal()
+    try:
+        written = rebuild_aggregates(db, survey_id=args.survey_id)
+    finally:
+        db.close()
+    print(f"Rebuilt {written} aggregate rows")
+
+
+def cmd_rebuild_terms(args) -> None:
+    db = SessionLocal()
+    try:
+        indexed = rebuild_term_index(db, survey_id=args.survey_id)
+    finally:
+        db.close()
+    print(f"Indexed terms from {indexed} responses")
+
+
+def cmd_backfill_answers(args) -> None:
+    db = SessionLocal()
+    try:
+        filled = backfill_answers(db, survey_id=args.survey_id)
+    finally:
+        db.close()
+    print(f"Backfilled answers for {filled} responses")
+
+
+def cmd_rescore(args) -> None:
+    from rescoring import rescore_responses  # pulls in the LLM client config, so only when needed
+
+    db = SessionLocal()
+    started = time.perf_counter()
+    try:
+        result = rescore_responses(db, survey_id=args.survey_id, chunk_size=args.chunk_size,
+                                   min_confidence=args.min_confidence, dry_run=args.dry_run)
+    finally:
+        db.close()
+    elapsed = time.perf_counter() - started
+    verb = "Would update" if args.dry_run else "Updated"
+    print(f"Scanned {result['scanned']} responses in {elapsed:.1f}s "
+          f"({result['scanned'] / max(elapsed, 1e-9):.0f}/s); {verb} {result['updated']} "
+          f"in {len(result['surveys'])} surveys")
+
+
+def cmd_backfill_analysis(args) -> None:
+    from analysis_backfill import run_analysis_backfill
+
+    run_migrations(engine)
+    stats = asyncio.run(run_analysis_backfill(survey_id=args.survey_id, concurrency=args.concurrency,
+                                              rpm=args.rpm, restart=args.restart))
+    print(f"Re-analyzed {stats['scanned']} responses from id {stats['resumed_from']}: "
+          f"{stats['analyzed']} analyzed, {stats['fallback']} still fallback, "
+          f"{stats['llm_calls']} LLM calls ({stats['llm_requests']} requests)")
+
+
+def cmd_migrate(args) -> None:
+    applied = run_migrations(engine)
+    print(f"Applied migrations: {', '.join(applied)}" if applied else "Database is up to date")
+
+
+def cmd_explain(args) -> None:
+    run_migrations(engine)
+    print(json.dumps(explain_endpoints(engine, survey_id=args.survey_id), indent=2))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Employee Survey System maintenance commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    rebuild = subparsers.add_parser("rebuild-aggregates", help="Recompute per-survey distribution counters")
+    rebuild.add_argument("--survey-id", type=int, default=None, help="Only rebuild this survey")
+    rebuild.set_defaults(func=cmd_rebuild_aggregates)
+
+    rebuild_terms = subparsers.add_parser("rebuild-terms", help="Recompute the word-cloud term index")
+    rebuild_terms.add_argument("--survey-id", type=int, default=None, help="Only rebuild this survey")
+    rebuild_terms.set_defaults(func=cmd_rebuild_terms)
+
+    backfill = subparsers.add_parser("backfill-answers", help="Copy answers of older responses into survey_answers")
+    backfill.add_argument("--survey-id", type=int, default=None, help="Only backfill this survey")
+    backfill.set_defaults(func=cmd_backfill_answers)
+
+    rescore = subparsers.add_parser("rescore", help="Re-label stored responses with the local lexicon analyzer")
+    rescore.add_argument("--survey-id", type=int, default=None, help="Only rescore this survey")
+    rescore.add_argument("--chunk-size", type=int, default=5000)
+    rescore.add_argument("--min-confidence", type=float, default=None,
+                         help="Leave rows scored below this confidence unchanged (default: LOCAL_CONFIDENCE_THRESHOLD)")
+    rescore.add_argument("--dry-run", action="store_true", help="Only count the rows that would change")
+    rescore.set_defaults(func=cmd_rescore)
+
+    backfill_analysis = subparsers.add_parser(
+        "backfill-analysis", help="Re-run the analysis of fallback, failed and unverified responses"
+    )
+    backfill_analysis.add_argument("--survey-id", type=int, default=None, help="Only backfill this survey")
+    backfill_analysis.add_argument("--concurrency", type=int, default=None,
+                                   help="LLM calls in flight at once (default: BACKFILL_CONCURRENCY)")
+    backfill_analysis.add_argument("--rpm", type=int, default=None,
+                                   help="LLM requests started per minute at most, chunks and retries included "
+                                        "(default: BACKFILL_RPM)")
+    backfill_analysis.add_argument("--restart", action="store_true", help="Ignore the saved checkpoint")
+    backfill_analysis.set_defaults(func=cmd_backfill_analysis)
+
+    migrate = subparsers.add_parser("migrate", help="Apply pending schema migrations")
+    migrate.set_defaults(func=cmd_migrate)
+
+    explain = subparsers.add_parser("explain", help="Print the query plan for each endpoint")
+    explain.add_argument("--survey-id", type=int, default=1)
+    explain.set_defaults(func=cmd_explain)
+
+    args = parser.parse_args()
+    Base.metadata.create_all(bind=engine)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
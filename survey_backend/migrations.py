@@ -0,0 +1,157 @@
+"""
+Versioned, idempotent schema migrations, each run once and recorded in schema_migrations.
+"""
+from datetime import datetime
+from sqlalchemy import text, inspect
+from sqlalchemy.exc import IntegrityError
+
+
+def _create_index(conn, name: str, table: str, columns: str, unique: bool = False) -> None:
+    conn.exec_driver_sql(
+        f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {name} ON {table} ({columns})"
+    )
+
+
+def m001_hot_path_indexes(conn) -> None:
+    _create_index(conn, "ix_survey_responses_survey_id_id", "survey_responses", "survey_id, id")
+    _create_index(conn, "ix_survey_responses_survey_user", "survey_responses", "survey_id, user_id")
+    _create_index(conn, "ix_survey_assignments_user_id", "survey_assignments", "user_id")
+    _create_index(conn, "ix_users_role_id", "users", "role, id")
+
+
+def m002_unique_survey_assignment(conn) -> None:
+    # Older assign_survey calls could leave duplicate rows; keep the oldest of each pair
+    conn.exec_driver_sql(
+        "DELETE FROM survey_assignments WHERE id NOT IN ("
+        " SELECT MIN(id) FROM survey_assignments GROUP BY survey_id, user_id)"
+    )
+    _create_index(conn, "uq_survey_assignments_survey_user", "survey_assignments", "survey_id, user_id", unique=True)
+
+
+def _add_column(conn, table: str, column: str, ddl: str) -> None:
+    if column not in {col["name"] for col in inspect(conn).get_columns(table)}:
+        conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}")
+
+
+def m003_survey_data_version(conn) -> None:
+    _add_column(conn, "surveys", "data_version", "INTEGER NOT NULL DEFAULT 0")
+
+
+def m004_response_submitted_at(conn) -> None:
+    _add_column(conn, "survey_responses", "submitted_at", "TIMESTAMP")  # DATETIME is not a PostgreSQL type
+    # Responses queued for analysis have a job created in the same transaction; use its time
+    conn.exec_driver_sql(
+        "UPDATE survey_responses SET submitted_at = ("
+        " SELECT analysis_jobs.created_at FROM analysis_jobs"
+        " WHERE analysis_jobs.response_id = survey_responses.id)"
+        " WHERE submitted_at IS NULL"
+    )
+
+
+def m005_response_analysis_status(conn) -> None:
+    _add_column(conn, "survey_responses", "analysis_status", "VARCHAR")
+    _create_index(conn, "ix_survey_responses_analysis_status", "survey_responses", "analysis_status")
+    # Unlabelled rows are either still queued or gave up. Rows labelled Neutral/Low may be
+    # the old hardcoded fallback, so they stay NULL (unverified) for the analysis backfill.
+    conn.exec_driver_sql(
+        "UPDATE survey_responses SET analysis_status = CASE"
+        " WHEN EXISTS (SELECT 1 FROM analysis_jobs WHERE analysis_jobs.response_id = survey_responses.id"
+        "  AND analysis_jobs.status IN ('pending', 'running')) THEN 'pending'"
+        " WHEN sentiment IS NULL THEN 'failed'"
+        " WHEN sentiment = 'Neutral' AND burnout_risk = 'Low' THEN NULL"
+        " ELSE 'analyzed' END"
+        " WHERE analysis_status IS NULL"
+    )
+
+
+def m006_job_available_at(conn) -> None:
+    _add_column(conn, "analysis_jobs", "available_at", "TIMESTAMP")
+
+
+MIGRATIONS = [
+    (1, "hot_path_indexes", m001_hot_path_indexes),
+    (2, "unique_survey_assignment", m002_unique_survey_assignment),
+    (3, "survey_data_version", m003_survey_data_version),
+    (4, "response_submitted_at", m004_response_submitted_at),
+    (5, "response_analysis_status", m005_response_analysis_status),
+    (6, "job_available_at", m006_job_available_at),
+]
+
+
+def _ensure_migrations_table(engine) -> None:
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            " version INTEGER PRIMARY KEY,"
+            " name VARCHAR NOT NULL,"
+            " applied_at VARCHAR NOT NULL)"
+        )
+
+
+def applied_versions(engine) -> set:
+    _ensure_migrations_table(engine)
+    with engine.connect() as conn:
+        return {row[0] for row in conn.exec_driver_sql("SELECT version FROM schema_migrations")}
+
+
+def run_migrations(engine) -> list:
+    """Apply pending migrations in version order. Returns the names applied."""
+    done = applied_versions(engine)
+    applied = []
+    for version, name, migrate in MIGRATIONS:
+        if version in done:
+            continue
+        try:
+            with engine.begin() as conn:
+                migrate(conn)
+                conn.execute(
+                    text("INSERT INTO schema_migrations (version, name, applied_at) VALUES (:v, :n, :t)"),
+                    {"v": version, "n": name, "t": datetime.utcnow().isoformat()},
+                )
+        except IntegrityError:
+            # Another worker recorded this version first
+            continue
+        applied.append(name)
+    return applied
+
+
+# Representative query for each endpoint's hot path, with sample parameters
+ENDPOINT_QUERIES = {
+    "POST /survey-responses/ (assignment check)":
+        "SELECT id FROM survey_assignments WHERE survey_id = :survey_id AND user_id = :user_id",
+    "GET /survey-responses/{survey_id}":
+        "SELECT * FROM survey_responses WHERE survey_id = :survey_id",
+    "GET /survey-responses/{survey_id}/export":
+        "SELECT id, answers FROM survey_responses WHERE survey_id = :survey_id AND id > 0 ORDER BY id LIMIT 1000",
+    "GET /employees/":
+        "SELECT id, username, role FROM users WHERE role = 'employee' AND id > 0 ORDER BY id",
+    "GET /analysis/survey/{survey_id}/distribution":
+        "SELECT dimension, label, count FROM survey_aggregates WHERE survey_id = :survey_id AND count > 0",
+    "GET /analysis/survey/{survey_id}/text-data":
+        "SELECT term, ngram, count FROM survey_terms WHERE survey_id = :survey_id ORDER BY count DESC LIMIT 100",
+    "GET /analysis/survey/{survey_id}/questions":
+        "SELECT question_key, COUNT(id), AVG(LENGTH(value)) FROM survey_answers"
+        " WHERE survey_id = :survey_id GROUP BY question_key",
+    "GET /analysis/survey/{survey_id}/questions/labels":
+        "SELECT survey_answers.question_key, survey_responses.sentiment, COUNT(survey_answers.id)"
+        " FROM survey_answers JOIN survey_responses ON survey_answers.response_id = survey_responses.id"
+        " WHERE survey_answers.survey_id = :survey_id"
+        " GROUP BY survey_answers.question_key, survey_responses.sentiment",
+    "GET /analysis/survey/{survey_id}/trend":
+        "SELECT bucket_start, label, count FROM survey_rollups WHERE survey_id = :survey_id"
+        " AND granularity = 'day' AND dimension = 'sentiment' AND bucket_start >= '2000-01-01' ORDER BY bucket_start",
+    "GET /analysis/survey/{survey_id}/report-table":
+        "SELECT survey_responses.id, users.username FROM survey_responses"
+        " JOIN users ON survey_responses.user_id = users.id WHERE survey_responses.survey_id = :survey_id",
+}
+
+
+def explain_endpoints(engine, survey_id: int = 1, user_id: int = 1) -> dict:
+    """Return the database's query plan for each endpoint query, to spot full table scans."""
+    prefix = "EXPLAIN QUERY PLAN " if engine.dialect.name == "sqlite" else "EXPLAIN "
+    plans = {}
+    with engine.connect() as conn:
+        for endpoint, sql in ENDPOINT_QUERIES.items():
+            rows = conn.execute(text(prefix + sql), {"survey_id": survey_id, "user_id": user_id})
+            plans[endpoint] = [str(row[-1]) for row in rows]
+    return plans
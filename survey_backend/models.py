@@ -0,0 +1,130 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Text, DateTime, UniqueConstraint, Index
+from sqlalchemy.orm import relationship
+from database import Base
+
+# ==============================
+# DATABASE MODELS
+# ==============================
+class User(Base):
+    __tablename__ = "users"
+    __table_args__ = (Index("ix_users_role_id", "role", "id"),)
+    id = Column(Integer, primary_key=True, index=True)
+    username = Column(String, unique=True, index=True, nullable=False)
+    hashed_password = Column(String, nullable=False)
+    role = Column(String, nullable=False)  # 'admin' or 'employee'
+
+
+class Survey(Base):
+    __tablename__ = "surveys"
+    id = Column(Integer, primary_key=True, index=True)
+    title = Column(String, nullable=False)
+    questions = Column(Text)  # Stored as JSON string
+    published = Column(Boolean, default=False)
+    data_version = Column(Integer, nullable=False, default=0, server_default="0")  # bumped on every write; see data_versions.py
+
+
+class SurveyAssignment(Base):
+    __tablename__ = "survey_assignments"
+    __table_args__ = (
+        Index("uq_survey_assignments_survey_user", "survey_id", "user_id", unique=True),
+        Index("ix_survey_assignments_user_id", "user_id"),
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    survey_id = Column(Integer, ForeignKey("surveys.id"))
+    user_id = Column(Integer, ForeignKey("users.id"))
+
+    survey = relationship("Survey")
+    user = relationship("User")
+
+
+class SurveyResponse(Base):
+    __tablename__ = "survey_responses"
+    __table_args__ = (
+        Index("ix_survey_responses_survey_id_id", "survey_id", "id"),
+        Index("ix_survey_responses_survey_user", "survey_id", "user_id"),
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    survey_id = Column(Integer, ForeignKey("surveys.id"))
+    user_id = Column(Integer, ForeignKey("users.id"))
+    answers = Column(Text)  # JSON string of answers
+    sentiment = Column(String, nullable=True)
+    burnout_risk = Column(String, nullable=True)
+    submitted_at = Column(DateTime, nullable=True, default=datetime.utcnow)  # NULL for rows older than the column
+    # pending, analyzed, fallback (labels are the hardcoded fallback), failed; NULL for unverified older rows
+    analysis_status = Column(String, nullable=True, default="pending", index=True)
+
+    survey = relationship("Survey")
+    user = relationship("User")
+
+
+class JobCheckpoint(Base):
+    __tablename__ = "job_checkpoints"
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True, nullable=False)
+    cursor = Column(Integer, nullable=False, default=0)  # last id fully processed
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class AnalysisJob(Base):
+    __tablename__ = "analysis_jobs"
+    id = Column(Integer, primary_key=True, index=True)
+    response_id = Column(Integer, ForeignKey("survey_responses.id"), unique=True, index=True, nullable=False)
+    status = Column(String, nullable=False, default="pending", index=True)  # pending, running, done, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+    available_at = Column(DateTime, nullable=True)  # a retried job is not claimed before this time
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    response = relationship("SurveyResponse")
+
+
+class SurveyAggregate(Base):
+    __tablename__ = "survey_aggregates"
+    __table_args__ = (UniqueConstraint("survey_id", "dimension", "label", name="uq_survey_aggregate"),)
+    id = Column(Integer, primary_key=True, index=True)
+    survey_id = Column(Integer, ForeignKey("surveys.id"), nullable=False)
+    dimension = Column(String, nullable=False)  # 'sentiment' or 'burnout_risk'
+    label = Column(String, nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class SurveyTerm(Base):
+    __tablename__ = "survey_terms"
+    __table_args__ = (
+        UniqueConstraint("survey_id", "term", name="uq_survey_term"),
+        Index("ix_survey_terms_survey_count", "survey_id", "count"),
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    survey_id = Column(Integer, ForeignKey("surveys.id"), nullable=False)
+    term = Column(String, nullable=False)  # a word or a space-joined n-gram
+    ngram = Column(Integer, nullable=False, default=1)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class SurveyAnswer(Base):
+    __tablename__ = "survey_answers"
+    __table_args__ = (
+        UniqueConstraint("response_id", "question_key", name="uq_survey_answer"),
+        Index("ix_survey_answers_survey_question", "survey_id", "question_key"),
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    response_id = Column(Integer, ForeignKey("survey_responses.id"), nullable=False)
+    survey_id = Column(Integer, ForeignKey("surveys.id"), nullable=False)  # copied from the response for per-survey GROUP BYs
+    question_key = Column(String, nullable=False)
+    value = Column(Text, nullable=False, default="")
+
+
+class SurveyRollup(Base):
+    __tablename__ = "survey_rollups"
+    __table_args__ = (
+        UniqueConstraint("survey_id", "granularity", "bucket_start", "dimension", "label", name="uq_survey_rollup"),
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    survey_id = Column(Integer, ForeignKey("surveys.id"), nullable=False)
+    granularity = Column(String, nullable=False)  # 'hour' or 'day'
+    bucket_start = Column(DateTime, nullable=False)  # UTC, truncated to the granularity
+    dimension = Column(String, nullable=False)  # 'sentiment' or 'burnout_risk'
+    label = Column(String, nullable=False)
+    count = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,49 @@
+import base64
+from typing import Optional
+from fastapi import HTTPException
+
+MAX_PAGE_SIZE = 500
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(last_id: int) -> str:
+    return base64.urlsafe_b64encode(str(last_id).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> int:
+    if not cursor:
+        return 0
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return int(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def parse_fields(fields: Optional[str], allowed: tuple) -> Optional[list]:
+    """Turn a `fields=a,b` projection into a validated column list (None means all fields)."""
+    if not fields:
+        return None
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in allowed]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    # id is always returned so clients can page and key their lists
+    return ["id"] + [field for field in requested if field != "id"]
+
+
+async def paginate(db, stmt, id_column, cursor: Optional[str], limit: Optional[int], scalars: bool = False):
+    """
+    Apply keyset pagination on `id_column` to a select() and run it. Returns (rows, next_cursor).
+    Without a limit the whole (filtered) result is returned, as before pagination existed.
+    """
+    stmt = stmt.where(id_column > decode_cursor(cursor)).order_by(id_column)
+    if limit is not None:
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        stmt = stmt.limit(limit + 1)
+    result = await db.execute(stmt)
+    rows = result.scalars().all() if scalars else result.all()
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1].id)
+    return rows, None
@@ -0,0 +1,121 @@
+import os
+import time
+import asyncio
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from passlib.context import CryptContext
+
+# ==============================
+# CONFIGURATION
+# ==============================
+HASH_POOL_SIZE = int(os.getenv("HASH_POOL_SIZE", str(min(2, os.cpu_count() or 1))))
+HASH_MAX_PENDING = int(os.getenv("HASH_MAX_PENDING", str(HASH_POOL_SIZE * 8)))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def _truncate(password: str) -> str:
+    safe_password = password
+    while len(safe_password.encode("utf-8")) > 72:
+        safe_password = safe_password[:-1]
+    return safe_password
+
+
+def get_password_hash(password: str) -> str:
+    return pwd_context.hash(_truncate(password))
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(_truncate(plain_password), hashed_password)
+
+
+class HashPoolSaturated(Exception):
+    """Raised when the hashing queue is full; callers should answer 503."""
+
+
+class PasswordHashPool:
+    """
+    Size-limited process pool that keeps bcrypt off the API process.
+    Past `max_pending` queued or running operations, callers get HashPoolSaturated.
+    """
+
+    def __init__(self, workers: int = HASH_POOL_SIZE, max_pending: int = HASH_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.counters = {"submitted": 0, "completed": 0, "rejected": 0, "max_pending_seen": 0, "busy_seconds": 0.0}
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: the API process runs background threads, which fork() does not copy safely
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def _acquire(self, n: int = 1) -> None:
+        with self._lock:
+            if self._pending + n > self.max_pending:
+                self.counters["rejected"] += 1
+                raise HashPoolSaturated("Password hashing queue is full")
+            self._pending += n
+            self.counters["submitted"] += n
+            self.counters["max_pending_seen"] = max(self.counters["max_pending_seen"], self._pending)
+
+    def _release(self, started: float, n: int = 1) -> None:
+        with self._lock:
+            self._pending -= n
+            self.counters["completed"] += n
+            self.counters["busy_seconds"] += (time.perf_counter() - started) * n
+
+    async def run(self, fn, *args):
+        self._acquire()
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            self._release(started)
+
+    async def hash(self, password: str) -> str:
+        return await self.run(get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self.run(verify_password, plain_password, hashed_password)
+
+    async def hash_many(self, passwords: list) -> list:
+        """Hash one password per worker at a time, so a bulk job never holds more than `workers` slots."""
+        hashes = []
+        loop = asyncio.get_running_loop()
+        for start in range(0, len(passwords), self.workers):
+            wave = passwords[start:start + self.workers]
+            self._acquire(len(wave))
+            started = time.perf_counter()
+            try:
+                executor = self._get_executor()
+                hashes += await asyncio.gather(
+                    *(loop.run_in_executor(executor, get_password_hash, password) for password in wave)
+                )
+            finally:
+                self._release(started, len(wave))
+        return hashes
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.counters)
+            stats["pending"] = self._pending
+        stats["workers"] = self.workers
+        stats["max_pending"] = self.max_pending
+        stats["avg_seconds"] = stats["busy_seconds"] / stats["completed"] if stats["completed"] else 0.0
+        return stats
+
+
+hash_pool = PasswordHashPool()
@@ -1,16 +1,97 @@
 import os
 import json
-from openai import OpenAI
+import asyncio
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Protocol
+from analysis_cache import analysis_cache, normalize_feedback
+from lexicon_analyzer import LexiconAnalyzer
+from llm_client import ResilientLLMClient
+from token_budget import (
+    estimate_tokens, expand_analysis, split_to_budget, pack_batches, LLM_OUTPUT_TOKENS_PER_ANALYSIS,
+)
 
 # Load your real API key (from .env or environment)
 PERPLEXITY_API_KEY = os.getenv("PERPLEXITY_API_KEY")
+# Overridable so benchmarks can point at a local stub (benchmarks/stub_llm.py)
+PERPLEXITY_BASE_URL = os.getenv("PERPLEXITY_BASE_URL", "https://api.perplexity.ai")
 
-client = OpenAI(
-    api_key=PERPLEXITY_API_KEY,
-    base_url="https://api.perplexity.ai"
-)
+# Pooled client with timeouts, retries, a concurrency cap and a circuit breaker (see llm_client.py);
+# acomplete() is used from the event loop (request path and analysis workers)
+llm = ResilientLLMClient(api_key=PERPLEXITY_API_KEY, base_url=PERPLEXITY_BASE_URL)
 
-def analyze_submission(submission_id: str, responses: dict):
+ANALYSIS_MODEL = "sonar-pro"
+PROMPT_VERSION = "2"  # bump when the prompt changes so cached analyses are invalidated
+MODEL_VERSION = f"{ANALYSIS_MODEL}:v{PROMPT_VERSION}"
+
+BATCH_SIZE = int(os.getenv("ANALYSIS_BATCH_SIZE", "10"))  # items per request; token_budget caps their size
+
+# 'hybrid': local analyzer first, LLM only below the confidence threshold
+# 'llm': every submission goes to the LLM; 'local': never call the LLM
+ANALYSIS_MODE = os.getenv("ANALYSIS_MODE", "hybrid")
+LOCAL_CONFIDENCE_THRESHOLD = float(os.getenv("LOCAL_CONFIDENCE_THRESHOLD", "0.75"))
+
+ANALYSIS_FALLBACK = {
+    "sentiment": "Neutral",
+    "burnout_risk": "Low",
+    "full_analysis_json": '{"status": "AI analysis failed"}'
+}
+
+# True non-answers; submissions made up only of these skip the LLM entirely. Short replies
+# such as "no" or "nothing" are real answers to yes/no and open questions, so they are analyzed.
+NO_CONTENT_ANSWERS = {"", "n/a", "na", "-", "no comment", "no comments"}
+NO_CONTENT_ANALYSIS = {
+    "emotional_tone": "Neutral",
+    "stress_level": "Low",
+    "burnout_risk": "Low",
+    "key_concerns": [],
+    "sentiment_score": 0
+}
+
+
+class Analyzer(Protocol):
+    """A local analyzer: analyze_texts() returns LLM-shaped analyses plus a 'confidence' in [0, 1]."""
+    name: str
+
+    def analyze_texts(self, texts: list) -> list:
+        ...
+
+
+local_analyzer = LexiconAnalyzer()
+_routing_lock = threading.Lock()
+routing_counters = {"local": 0, "escalated": 0}
+
+
+def set_local_analyzer(analyzer) -> None:
+    """Swap the local analyzer (any Analyzer); None sends everything to the LLM."""
+    global local_analyzer
+    local_analyzer = analyzer
+
+
+_token_lock = threading.Lock()
+token_counters = {"requests": 0, "input_tokens": 0, "output_token_budget": 0, "chunked": 0, "truncated": 0}
+
+
+def token_stats() -> dict:
+    """Estimated tokens sent and max_tokens requested so far, and how many submissions were chunked."""
+    with _token_lock:
+        stats = dict(token_counters)
+    stats["avg_input_tokens"] = round(stats["input_tokens"] / stats["requests"], 1) if stats["requests"] else 0
+    return stats
+
+
+def routing_stats() -> dict:
+    with _routing_lock:
+        stats = dict(routing_counters)
+    stats["mode"] = ANALYSIS_MODE
+    stats["analyzer"] = local_analyzer.name if local_analyzer is not None else None
+    stats["confidence_threshold"] = LOCAL_CONFIDENCE_THRESHOLD
+    return stats
+
+
+def build_feedback_text(responses: dict) -> str:
     text_parts = []
     if isinstance(responses, dict):
         for key, value in responses.items():
@@ -21,44 +102,384 @@ def analyze_submission(submission_id: str, responses: dict):
             elif isinstance(value, str):
                 text_parts.append(f"{key}: {value}")
 
-    text_feedback = " ".join(text_parts)
+    return " ".join(text_parts)
+
+
+def _answer_values(responses: dict) -> list:
+    values = []
+    if isinstance(responses, dict):
+        for value in responses.values():
+            if isinstance(value, dict):
+                values.extend(v for v in value.values() if isinstance(v, str))
+            elif isinstance(value, str):
+                values.append(value)
+    return values
+
+
+def _known_analysis(responses: dict, text_feedback: str):
+    """Return an analysis without calling the LLM when the feedback is empty or already cached."""
+    if all(normalize_feedback(v).strip(" .!") in NO_CONTENT_ANSWERS for v in _answer_values(responses)):
+        return dict(NO_CONTENT_ANALYSIS)
+    return analysis_cache.get(text_feedback, MODEL_VERSION)
+
 
+def _analysis_result(submission_id, analysis: dict, text_feedback: str, processed_at: str,
+                     ai_model: str = ANALYSIS_MODEL) -> dict:
+    return {
+        "submission_id": submission_id,
+        "analysis": analysis,
+        "processed_at": processed_at,
+        "ai_model": ai_model,
+        "original_feedback": text_feedback
+    }
+
+
+def _local_pass(items: list, results: dict, processed_at: str) -> list:
+    """
+    Score (id, text) items with the local analyzer in one vectorized call. Confident
+    analyses go straight into `results`; the items still needing the LLM are returned.
+    """
+    if not items or local_analyzer is None or ANALYSIS_MODE == "llm":
+        return items
+    analyses = local_analyzer.analyze_texts([text for _, text in items])
+    remaining = []
+    for (item_id, text_feedback), analysis in zip(items, analyses):
+        if ANALYSIS_MODE == "local" or analysis["confidence"] >= LOCAL_CONFIDENCE_THRESHOLD:
+            results[item_id] = _analysis_result(item_id, analysis, text_feedback, processed_at, local_analyzer.name)
+        else:
+            remaining.append((item_id, text_feedback))
+    with _routing_lock:
+        routing_counters["local"] += len(items) - len(remaining)
+        routing_counters["escalated"] += len(remaining)
+    return remaining
+
+
+def _strip_code_fences(response_text: str) -> str:
+    return response_text.strip().replace("```json", "").replace("```", "").strip()
+
+
+def _now() -> str:
+    return datetime.now().astimezone().isoformat()
+
+
+# Compact reply keys (see token_budget.COMPACT_KEYS) keep replies, and so max_tokens, small
+COMPACT_SCHEMA = (
+    't: emotional_tone (Positive, Neutral or Negative), s: stress_level (Low, Medium or High), '
+    'b: burnout_risk (Low, Medium or High), c: key_concerns (at most 3, a few words each), '
+    'v: sentiment_score (-1 to 1)'
+)
+
+
+def _budgeted_request(prompt: str, analyses: int) -> dict:
+    max_tokens = LLM_OUTPUT_TOKENS_PER_ANALYSIS * analyses
+    with _token_lock:
+        token_counters["requests"] += 1
+        token_counters["input_tokens"] += estimate_tokens(prompt)
+        token_counters["output_token_budget"] += max_tokens
+    return {
+        "model": ANALYSIS_MODEL,
+        "messages": [
+            {"role": "system", "content": "Always respond with valid JSON only."},
+            {"role": "user", "content": prompt}
+        ],
+        "temperature": 0.7,
+        "max_tokens": max_tokens
+    }
+
+
+def _single_request(text_feedback: str) -> dict:
     prompt = f"""
     Analyze the following employee feedback for emotional tone and stress levels:
 
     Feedback: {text_feedback}
 
-    Return valid JSON only with keys:
-    emotional_tone, stress_level, burnout_risk, key_concerns, sentiment_score
+    Return one valid JSON object only, with keys:
+    {COMPACT_SCHEMA}
+    """
+    return _budgeted_request(prompt, 1)
+
+
+def _batch_request(items: list) -> dict:
+    feedback_block = "\n".join(
+        json.dumps({"id": str(item_id), "feedback": text}) for item_id, text in items
+    )
+    prompt = f"""
+    Analyze each of the following employee feedback entries for emotional tone and stress levels.
+    Each line is a JSON object with an "id" and its "feedback":
+
+    {feedback_block}
+
+    Return a valid JSON array only, with one object per entry, each with keys:
+    id, {COMPACT_SCHEMA}
+    """
+    return _budgeted_request(prompt, len(items))
+
+
+def _parse_single(content: str) -> dict:
+    parsed = json.loads(_strip_code_fences(content))
+    if not isinstance(parsed, dict):
+        raise ValueError("Analysis did not return a JSON object")
+    return expand_analysis(parsed)
+
+
+def _parse_batch(content: str, items: list) -> dict:
+    """
+    Map a batch reply to {id: analysis}.
+    Raises ValueError when the model output is not a JSON array covering every id.
+    """
+    parsed = json.loads(_strip_code_fences(content))
+    if not isinstance(parsed, list):
+        raise ValueError("Batch analysis did not return a JSON array")
+
+    by_id = {}
+    for entry in parsed:
+        if isinstance(entry, dict) and "id" in entry:
+            by_id[str(entry.pop("id"))] = expand_analysis(entry)
+    missing = [item_id for item_id, _ in items if str(item_id) not in by_id]
+    if missing:
+        raise ValueError(f"Batch analysis missing ids: {missing}")
+    return {item_id: by_id[str(item_id)] for item_id, _ in items}
+
+
+def _pending_items(submissions: dict, results: dict) -> list:
+    """Fill `results` with cached, no-content and confident local analyses; return the (id, text) pairs still to send."""
+    items = []
+    processed_at = _now()
+    for sid, responses in submissions.items():
+        text_feedback = build_feedback_text(responses)
+        known = _known_analysis(responses, text_feedback)
+        if known is not None:
+            results[sid] = _analysis_result(sid, known, text_feedback, processed_at)
+        else:
+            items.append((sid, text_feedback))
+    return _local_pass(items, results, processed_at)
+
+
+def _store_batch(items: list, analyses: dict, results: dict) -> None:
+    processed_at = _now()
+    for item_id, text_feedback in items:
+        analysis_cache.set(text_feedback, MODEL_VERSION, analyses[item_id])
+        results[item_id] = _analysis_result(item_id, analyses[item_id], text_feedback, processed_at)
+
+
+RISK_LEVELS = ("Low", "Medium", "High")
+
+
+def normalize_label(value, default: str) -> str:
+    """Providers are not consistent about case ('high', 'High'); labels are kept capitalized."""
+    return value.strip().capitalize() if isinstance(value, str) and value.strip() else default
+
+
+def merge_analyses(analyses: list, weights: list) -> dict:
+    """
+    Reduce chunk analyses of one submission to one: tone by weighted vote, sentiment_score
+    as the weighted mean, stress and burnout as the highest level seen, concerns deduplicated.
     """
+    tones = Counter()
+    score_sum = weight_sum = 0.0
+    for analysis, weight in zip(analyses, weights):
+        tones[normalize_label(analysis.get("emotional_tone"), "Neutral")] += weight
+        try:
+            score_sum += float(analysis.get("sentiment_score", 0)) * weight
+            weight_sum += weight
+        except (TypeError, ValueError):
+            pass
+    merged = {
+        "emotional_tone": tones.most_common(1)[0][0],
+        "sentiment_score": round(score_sum / weight_sum, 2) if weight_sum else 0,
+    }
+    for key in ("stress_level", "burnout_risk"):
+        levels = [level for level in (normalize_label(a.get(key), "") for a in analyses) if level in RISK_LEVELS]
+        merged[key] = max(levels, key=RISK_LEVELS.index) if levels else "Low"
+    concerns = Counter(
+        concern for a in analyses for concern in (a.get("key_concerns") or []) if isinstance(concern, str)
+    )
+    merged["key_concerns"] = [concern for concern, _ in concerns.most_common(5)]
+    return merged
+
+
+def _chunks(text_feedback: str) -> list:
+    chunks, truncated = split_to_budget(text_feedback)
+    if len(chunks) > 1:
+        with _token_lock:
+            token_counters["chunked"] += 1
+            token_counters["truncated"] += truncated
+    return chunks
+
+
+def _reduce_chunks(chunks: list, analyses: list) -> dict:
+    """Merge the chunk analyses that succeeded (None marks a failed chunk)."""
+    done = [(analysis, estimate_tokens(chunk)) for chunk, analysis in zip(chunks, analyses) if analysis is not None]
+    if not done:
+        raise ValueError(f"All {len(chunks)} chunks failed")
+    return merge_analyses([analysis for analysis, _ in done], [weight for _, weight in done])
+
 
+def _chunk_analysis(chunk: str):
     try:
-        response = client.chat.completions.create(
-            model="sonar-pro",
-            messages=[
-                {"role": "system", "content": "Always respond with valid JSON only."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=1500
-        )
+        return _parse_single(llm.complete(**_single_request(chunk)).choices[0].message.content)
+    except Exception as e:
+        print(f"Error during chunk analysis: {e}")
+        return None
+
+
+async def _chunk_analysis_async(chunk: str, before_request=None):
+    try:
+        return _parse_single((await llm.acomplete(before_request, **_single_request(chunk))).choices[0].message.content)
+    except Exception as e:
+        print(f"Error during chunk analysis: {e}")
+        return None
+
+
+def llm_analysis(submission_id, text_feedback: str) -> dict:
+    """
+    LLM analysis of one feedback text; ANALYSIS_FALLBACK if the call or its output fails.
+    Text over the input budget is split into chunks, analyzed in parallel and merged.
+    """
+    try:
+        chunks = _chunks(text_feedback)
+        if len(chunks) == 1:
+            analysis = _parse_single(llm.complete(**_single_request(text_feedback)).choices[0].message.content)
+        else:
+            with ThreadPoolExecutor(max_workers=len(chunks)) as pool:
+                analysis = _reduce_chunks(chunks, list(pool.map(_chunk_analysis, chunks)))
+        analysis_cache.set(text_feedback, MODEL_VERSION, analysis)
+
+        return _analysis_result(submission_id, analysis, text_feedback, _now())
+
+    except Exception as e:
+        print(f"Error during analysis: {e}")
+        return dict(ANALYSIS_FALLBACK)
 
-        response_text = response.choices[0].message.content.strip()
-        response_text = response_text.replace("```json", "").replace("```", "").strip()
-        analysis = json.loads(response_text)
 
-        return {
-            "submission_id": submission_id,
-            "analysis": analysis,
-            "processed_at": "2025-11-04T12:00:00+05:30",
-            "ai_model": "sonar-pro",
-            "original_feedback": text_feedback
-        }
+async def llm_analysis_async(submission_id, text_feedback: str, before_request=None) -> dict:
+    """Async llm_analysis; `before_request` is passed to every acomplete() call (see llm_client.py)."""
+    try:
+        chunks = _chunks(text_feedback)
+        if len(chunks) == 1:
+            response = await llm.acomplete(before_request, **_single_request(text_feedback))
+            analysis = _parse_single(response.choices[0].message.content)
+        else:
+            analyses = await asyncio.gather(*(_chunk_analysis_async(chunk, before_request) for chunk in chunks))
+            analysis = _reduce_chunks(chunks, analyses)
+        # The cache does blocking sqlite I/O, so it never runs on the event loop
+        await asyncio.to_thread(analysis_cache.set, text_feedback, MODEL_VERSION, analysis)
+
+        return _analysis_result(submission_id, analysis, text_feedback, _now())
 
     except Exception as e:
         print(f"Error during analysis: {e}")
-        return {
-            "sentiment": "Neutral",
-            "burnout_risk": "Low",
-            "full_analysis_json": '{"status": "AI analysis failed"}'
-        }
+        return dict(ANALYSIS_FALLBACK)
+
+
+def analysis_without_llm(submission_id, responses: dict, text_feedback: str):
+    """The no-content, cached or confident local result for one submission, else None."""
+    known = _known_analysis(responses, text_feedback)
+    if known is not None:
+        return _analysis_result(submission_id, known, text_feedback, _now())
+    local_results = {}
+    if not _local_pass([(submission_id, text_feedback)], local_results, _now()):
+        return local_results[submission_id]
+    return None
+
+
+def analyze_submission(submission_id: str, responses: dict):
+    text_feedback = build_feedback_text(responses)
+    result = analysis_without_llm(submission_id, responses, text_feedback)
+    return result if result is not None else llm_analysis(submission_id, text_feedback)
+
+
+async def analyze_submission_async(submission_id: str, responses: dict):
+    """
+    Same as analyze_submission, using the async client so the event loop is never blocked;
+    the cache lookup and local scoring run in a worker thread.
+    """
+    text_feedback = build_feedback_text(responses)
+    result = await asyncio.to_thread(analysis_without_llm, submission_id, responses, text_feedback)
+    return result if result is not None else await llm_analysis_async(submission_id, text_feedback)
+
+
+def _analyze_items(items: list, submissions: dict, results: dict) -> None:
+    if len(items) == 1:
+        item_id, text_feedback = items[0]
+        results[item_id] = llm_analysis(item_id, text_feedback)
+        return
+    try:
+        response = llm.complete(**_batch_request(items))
+        analyses = _parse_batch(response.choices[0].message.content, items)
+    except ValueError as e:
+        # Malformed or partial output: split the batch and retry each half
+        print(f"Batch analysis of {len(items)} items was malformed, splitting: {e}")
+        middle = len(items) // 2
+        _analyze_items(items[:middle], submissions, results)
+        _analyze_items(items[middle:], submissions, results)
+        return
+    except Exception as e:
+        print(f"Error during batch analysis: {e}")
+        for item_id, _ in items:
+            results[item_id] = dict(ANALYSIS_FALLBACK)
+        return
+    _store_batch(items, analyses, results)
+
+
+async def _analyze_items_async(items: list, submissions: dict, results: dict) -> None:
+    if len(items) == 1:
+        item_id, text_feedback = items[0]
+        results[item_id] = await llm_analysis_async(item_id, text_feedback)
+        return
+    try:
+        response = await llm.acomplete(**_batch_request(items))
+        analyses = _parse_batch(response.choices[0].message.content, items)
+    except ValueError as e:
+        print(f"Batch analysis of {len(items)} items was malformed, splitting: {e}")
+        middle = len(items) // 2
+        await asyncio.gather(
+            _analyze_items_async(items[:middle], submissions, results),
+            _analyze_items_async(items[middle:], submissions, results),
+        )
+        return
+    except Exception as e:
+        print(f"Error during batch analysis: {e}")
+        for item_id, _ in items:
+            results[item_id] = dict(ANALYSIS_FALLBACK)
+        return
+    await asyncio.to_thread(_store_batch, items, analyses, results)
+
+
+def analyze_batch(submissions: dict, batch_size: int = BATCH_SIZE) -> dict:
+    """
+    Analyze {submission_id: responses} in batches of up to batch_size items within the token budget.
+    Returns {submission_id: result} shaped like analyze_submission's.
+    """
+    results = {}
+    for batch in pack_batches(_pending_items(submissions, results), batch_size):
+        _analyze_items(batch, submissions, results)
+    return results
+
+
+async def analyze_batch_async(submissions: dict, batch_size: int = BATCH_SIZE) -> dict:
+    """Async analyze_batch; the batches are sent concurrently and cache I/O runs in worker threads."""
+    results = {}
+    items = await asyncio.to_thread(_pending_items, submissions, results)
+    await asyncio.gather(*(
+        _analyze_items_async(batch, submissions, results)
+        for batch in pack_batches(items, batch_size)
+    ))
+    return results
+
+
+def extract_labels(ai_results: dict):
+    """Return (sentiment, burnout_risk) from either the success or the fallback result shape."""
+    ai_results = ai_results or {}
+    if "analysis" not in ai_results:
+        sentiment = ai_results.get("sentiment", "Neutral")
+        burnout_risk = ai_results.get("burnout_risk", "Low")
+    else:
+        sentiment = ai_results["analysis"].get("emotional_tone", "Neutral")
+        burnout_risk = ai_results["analysis"].get("burnout_risk", "Low")
+    return normalize_label(sentiment, "Neutral"), normalize_label(burnout_risk, "Low")
+
+
+def is_fallback(ai_results: dict) -> bool:
+    """True for the hardcoded ANALYSIS_FALLBACK shape, i.e. no analysis was actually made."""
+    return "analysis" not in (ai_results or {})
@@ -0,0 +1,73 @@
+"""
+Bulk re-scoring of stored responses with the lexicon analyzer, in id-ordered chunks.
+Only changed labels the lexicon is confident about are written, and only on analyzed rows.
+"""
+import numpy as np
+from sqlalchemy import update
+from models import SurveyResponse
+from aggregates import rebuild_aggregates, UNKNOWN_LABEL
+from serialization import parse_answers
+from perplexityai_analysis import build_feedback_text, LOCAL_CONFIDENCE_THRESHOLD
+from lexicon_analyzer import LexiconAnalyzer, label_tones, label_risks
+
+RESCORE_CHUNK_SIZE = 5000
+
+
+def rescore_chunk(analyzer, rows: list, min_confidence: float) -> list:
+    """
+    Score (id, answers, sentiment, burnout_risk) rows and return
+    {"id", "sentiment", "burnout_risk"} updates for the labels that changed.
+    """
+    texts = [build_feedback_text(parse_answers(answers)) for _, answers, _, _ in rows]
+    plain, negated, token_counts = analyzer.term_matrices(texts)
+    scores = analyzer.score_matrices(plain, negated, token_counts)
+    tones = label_tones(scores["sentiment"])
+    risks = label_risks(scores["burnout"])
+
+    old_tones = np.array([sentiment or UNKNOWN_LABEL for _, _, sentiment, _ in rows])
+    old_risks = np.array([burnout_risk or UNKNOWN_LABEL for _, _, _, burnout_risk in rows])
+    changed = (scores["confidence"] >= min_confidence) & ((tones != old_tones) | (risks != old_risks))
+    return [
+        {"id": rows[i][0], "sentiment": str(tones[i]), "burnout_risk": str(risks[i])}
+        for i in np.flatnonzero(changed)
+    ]
+
+
+def rescore_responses(db, survey_id: int = None, chunk_size: int = RESCORE_CHUNK_SIZE,
+                      min_confidence: float = None, dry_run: bool = False,
+                      analyzer=None) -> dict:
+    """
+    Re-label responses with the local analyzer. Returns {"scanned", "updated", "surveys"}.
+    With dry_run, nothing is written and "updated" is the number of rows that would change.
+    """
+    analyzer = analyzer or LexiconAnalyzer()
+    if min_confidence is None:
+        min_confidence = LOCAL_CONFIDENCE_THRESHOLD
+    scanned = updated = 0
+    touched = set()
+    last_id = 0
+    while True:
+        query = db.query(
+            SurveyResponse.id, SurveyResponse.answers, SurveyResponse.sentiment, SurveyResponse.burnout_risk,
+            SurveyResponse.survey_id,
+        ).filter(SurveyResponse.id > last_id, SurveyResponse.analysis_status == "analyzed")
+        if survey_id is not None:
+            query = query.filter(SurveyResponse.survey_id == survey_id)
+        rows = query.order_by(SurveyResponse.id).limit(chunk_size).all()
+        if not rows:
+            break
+        changes = rescore_chunk(analyzer, [tuple(row[:4]) for row in rows], min_confidence)
+        if changes:
+            survey_of = {row.id: row.survey_id for row in rows}
+            touched.update(survey_of[change["id"]] for change in changes)
+            if not dry_run:
+                db.execute(update(SurveyResponse), changes)
+                db.commit()
+        scanned += len(rows)
+        updated += len(changes)
+        last_id = rows[-1].id
+
+    if not dry_run:
+        for touched_id in sorted(touched):
+            rebuild_aggregates(db, survey_id=touched_id)
+    return {"scanned": scanned, "updated": updated, "surveys": sorted(touched)}
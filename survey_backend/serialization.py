@@ -0,0 +1,68 @@
+"""
+Fast path for large list endpoints: column tuples encoded with orjson, skipping ORM objects
+and response_model validation. Row shapes must match the response_model on the route.
+"""
+import orjson
+from fastapi.responses import JSONResponse
+from sqlalchemy import select
+from models import SurveyResponse
+
+RESPONSE_COLUMNS = (
+    SurveyResponse.id,
+    SurveyResponse.survey_id,
+    SurveyResponse.user_id,
+    SurveyResponse.answers,
+    SurveyResponse.sentiment,
+    SurveyResponse.burnout_risk,
+    SurveyResponse.submitted_at,
+    SurveyResponse.analysis_status,
+)
+
+
+class FastJSONResponse(JSONResponse):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+def parse_answers(answers: str) -> dict:
+    try:
+        return orjson.loads(answers) if answers else {}
+    except orjson.JSONDecodeError:
+        return {}
+
+
+def select_responses(survey_id: int):
+    return select(*RESPONSE_COLUMNS).where(SurveyResponse.survey_id == survey_id).order_by(SurveyResponse.id)
+
+
+def response_rows(rows) -> list:
+    """SurveyResponseOut-shaped dicts from RESPONSE_COLUMNS rows."""
+    return [
+        {
+            "id": row.id,
+            "survey_id": row.survey_id,
+            "user_id": row.user_id,
+            "answers": parse_answers(row.answers),
+            "sentiment": row.sentiment,
+            "burnout_risk": row.burnout_risk,
+            "submitted_at": row.submitted_at,
+            "analysis_status": row.analysis_status,
+        }
+        for row in rows
+    ]
+
+
+def report_rows(rows) -> list:
+    """SurveyReportRow-shaped dicts from (id, user_id, username, sentiment, burnout_risk) rows."""
+    return [
+        {
+            "response_id": response_id,
+            "user_id": user_id,
+            "username": username,
+            "sentiment": sentiment,
+            "burnout_risk": burnout_risk,
+        }
+        for response_id, user_id, username, sentiment, burnout_risk in rows
+    ]
@@ -0,0 +1,108 @@
+import re
+import json
+from collections import Counter
+from sqlalchemy import delete
+from models import SurveyTerm, SurveyResponse
+from aggregates import increment_counters
+from data_versions import bump_survey_versions
+
+MAX_NGRAM = 2
+MAX_TOP_K = 500
+
+_TOKEN = re.compile(r"[a-z][a-z']+")
+_CLAUSE_BREAK = re.compile(r"[.,;:!?()\[\]\n\"]+")
+
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are aren't as at be because been before being
+below between both but by can can't cannot could couldn't did didn't do does doesn't doing don't down
+during each few for from further get got had hadn't has hasn't have haven't having he her here hers
+herself him himself his how i i'm i've if in into is isn't it it's its itself just let's me more most
+much my myself no nor not of off on once only or other ought our ours ourselves out over own really
+same she should shouldn't so some such than that that's the their theirs them themselves then there
+there's these they they're this those through to too under until up us very was wasn't we we're were
+weren't what when where which while who whom why will with won't would wouldn't yes you you're your
+yours yourself yourselves
+""".split())
+
+
+def extract_terms(text: str, max_ngram: int = MAX_NGRAM) -> Counter:
+    """Count stopword-free unigrams and n-grams; n-grams never span punctuation or a removed stopword."""
+    terms = Counter()
+    for clause in _CLAUSE_BREAK.split(text.lower()):
+        run = []
+        for token in _TOKEN.findall(clause) + [None]:
+            if token is None or token in STOPWORDS or len(token) < 3:
+                for n in range(1, max_ngram + 1):
+                    for start in range(len(run) - n + 1):
+                        terms[(" ".join(run[start:start + n]), n)] += 1
+                run = []
+            else:
+                run.append(token.strip("'"))
+    return terms
+
+
+def answer_terms(answers: dict) -> Counter:
+    terms = Counter()
+    for value in (answers or {}).values():
+        if isinstance(value, str):
+            terms.update(extract_terms(value))
+    return terms
+
+
+def index_response_terms(db, survey_id: int, answers: dict) -> None:
+    """Add one response's terms to the survey's index in the caller's transaction."""
+    increment_counters(db, SurveyTerm, ("survey_id", "term"), [
+        {"survey_id": survey_id, "term": term, "ngram": n, "count": count}
+        for (term, n), count in answer_terms(answers).items()
+    ])
+
+
+def top_terms(db, survey_id: int, top_k: int = 100) -> list:
+    rows = db.query(SurveyTerm.term, SurveyTerm.ngram, SurveyTerm.count).filter(
+        SurveyTerm.survey_id == survey_id
+    ).order_by(SurveyTerm.count.desc(), SurveyTerm.term).limit(max(1, min(top_k, MAX_TOP_K)))
+    return [{"text": term, "ngram": ngram, "value": count} for term, ngram, count in rows]
+
+
+def rebuild_term_index(db, survey_id: int = None, chunk_size: int = 1000) -> int:
+    """Recompute term counts from stored answers. Returns the number of responses indexed."""
+    clear = delete(SurveyTerm)
+    if survey_id is not None:
+        clear = clear.where(SurveyTerm.survey_id == survey_id)
+    db.execute(clear)
+
+    per_survey = {}
+    indexed = 0
+    last_id = 0
+    while True:
+        query = db.query(SurveyResponse.id, SurveyResponse.survey_id, SurveyResponse.answers).filter(
+            SurveyResponse.id > last_id
+        )
+        if survey_id is not None:
+            query = query.filter(SurveyResponse.survey_id == survey_id)
+        rows = query.order_by(SurveyResponse.id).limit(chunk_size).all()
+        if not rows:
+            break
+        for response_id, row_survey_id, answers_json in rows:
+            try:
+                answers = json.loads(answers_json or "{}")
+            except json.JSONDecodeError:
+                continue
+            per_survey.setdefault(row_survey_id, Counter()).update(answer_terms(answers))
+            indexed += 1
+        last_id = rows[-1].id
+
+    for row_survey_id, terms in per_survey.items():
+        increment_counters(db, SurveyTerm, ("survey_id", "term"), [
+            {"survey_id": row_survey_id, "term": term, "ngram": n, "count": count}
+            for (term, n), count in terms.items()
+        ])
+    bump_survey_versions(db, None if survey_id is None else [survey_id])
+    db.commit()
+    return indexed
+
+
+def ensure_term_index(db) -> None:
+    """Build the index once for databases that predate the survey_terms table."""
+    if db.query(SurveyTerm.id).first() is None and db.query(SurveyResponse.id).first() is not None:
+        rebuild_term_index(db)
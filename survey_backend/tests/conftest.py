@@ -0,0 +1,73 @@
+import os
+import sys
+import tempfile
+
+# Modules read their configuration at import, so the environment is set before anything is imported
+TEST_DIR = tempfile.mkdtemp(prefix="survey_tests_")
+os.environ["DATABASE_URL"] = f"sqlite:///{TEST_DIR}/test.db"
+os.environ["ANALYSIS_CACHE_PATH"] = f"{TEST_DIR}/analysis_cache.db"
+os.environ["PERPLEXITY_API_KEY"] = "test"
+os.environ["PERPLEXITY_BASE_URL"] = "http://127.0.0.1:9"  # nothing listens here, so LLM calls fail fast
+os.environ["LLM_MAX_RETRIES"] = "0"
+os.environ["ANALYSIS_WORKERS"] = "1"
+os.environ["HASH_POOL_SIZE"] = "1"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from database import Base, engine, SessionLocal
+from migrations import run_migrations
+import models  # noqa: F401  (registers the tables)
+
+Base.metadata.create_all(bind=engine)
+run_migrations(engine)
+
+
+def _clear_tables() -> None:
+    with engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            conn.execute(table.delete())
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        _clear_tables()
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    import main
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def api(client):
+    yield client
+    _clear_tables()
+
+
+@pytest.fixture
+def admin_headers(api):
+    api.post("/users/", json={"username": "admin", "password": "secret123", "role": "admin"})
+    token = api.post("/token", data={"username": "admin", "password": "secret123"}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def add_survey(db, title: str = "Pulse", questions: str = '["How are you?"]'):
+    survey = models.Survey(title=title, questions=questions, published=False)
+    db.add(survey)
+    db.commit()
+    return survey
+
+
+def add_users(db, count: int, role: str = "employee", prefix: str = "user") -> list:
+    users = [models.User(username=f"{prefix}{i}", hashed_password="x", role=role) for i in range(count)]
+    db.add_all(users)
+    db.commit()
+    return users
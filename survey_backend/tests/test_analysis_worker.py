@@ -0,0 +1,119 @@
+from datetime import datetime, timedelta
+from analysis_worker import (
+    enqueue_analysis, claim_jobs, load_submissions, store_results, requeue_stale_jobs,
+    MAX_ATTEMPTS, FALLBACK_ERROR, STALE_JOB_MINUTES,
+)
+from models import AnalysisJob, Survey, SurveyResponse
+from perplexityai_analysis import ANALYSIS_FALLBACK
+from conftest import add_survey, add_users
+
+RESULT = {"analysis": {"emotional_tone": "negative", "burnout_risk": "high"}}
+
+
+def submit(db, count: int = 1) -> list:
+    survey = add_survey(db)
+    user = add_users(db, 1)[0]
+    responses = [
+        SurveyResponse(survey_id=survey.id, user_id=user.id, answers='{"q1": "Long weeks"}', analysis_status="pending")
+        for _ in range(count)
+    ]
+    db.add_all(responses)
+    db.flush()
+    for response in responses:
+        enqueue_analysis(db, response.id)
+    db.commit()
+    return responses
+
+
+def run_attempt(db, results: dict, error: str = "No analysis result returned") -> list:
+    jobs = claim_jobs(db)
+    responses, _ = load_submissions(db, jobs)
+    store_results(db, jobs, responses, results, error)
+    return jobs
+
+
+def make_due(db) -> None:
+    db.query(AnalysisJob).update({"available_at": datetime.utcnow() - timedelta(seconds=1)})
+    db.commit()
+
+
+def test_claim_moves_pending_jobs_to_running_once(db):
+    submit(db, 2)
+    jobs = claim_jobs(db)
+    assert [(job.status, job.attempts) for job in jobs] == [("running", 1), ("running", 1)]
+    assert claim_jobs(db) == []
+
+
+def test_successful_result_finishes_job_and_labels_response(db):
+    response = submit(db)[0]
+    version = db.get(Survey, response.survey_id).data_version
+    jobs = claim_jobs(db)
+    responses, _ = load_submissions(db, jobs)
+    deltas = store_results(db, jobs, responses, {response.id: RESULT}, "unused")
+
+    db.refresh(response)
+    assert jobs[0].status == "done" and jobs[0].last_error is None
+    assert (response.sentiment, response.burnout_risk, response.analysis_status) == ("Negative", "High", "analyzed")
+    assert db.get(Survey, response.survey_id).data_version == version + 1
+    assert deltas[response.survey_id]["sentiment"]["Negative"] == 1
+
+
+def test_missing_result_is_retried_after_a_delay(db):
+    response = submit(db)[0]
+    job = run_attempt(db, {}, "provider down")[0]
+
+    assert job.status == "pending" and job.last_error == "provider down"
+    assert job.available_at > datetime.utcnow()
+    assert claim_jobs(db) == []  # not due yet
+    make_due(db)
+    assert [j.attempts for j in claim_jobs(db)] == [2]
+    db.refresh(response)
+    assert response.analysis_status == "pending"
+
+
+def test_fallback_result_is_retried_then_stored_on_the_last_attempt(db):
+    response = submit(db)[0]
+    for attempt in range(1, MAX_ATTEMPTS):
+        job = run_attempt(db, {response.id: dict(ANALYSIS_FALLBACK)})[0]
+        assert (job.status, job.attempts, job.last_error) == ("pending", attempt, FALLBACK_ERROR)
+        db.refresh(response)
+        assert response.analysis_status == "pending"
+        make_due(db)
+
+    job = run_attempt(db, {response.id: dict(ANALYSIS_FALLBACK)})[0]
+    db.refresh(response)
+    assert (job.status, job.attempts) == ("failed", MAX_ATTEMPTS)
+    assert (response.sentiment, response.burnout_risk, response.analysis_status) == ("Neutral", "Low", "fallback")
+
+
+def test_no_result_on_the_last_attempt_marks_the_response_failed(db):
+    response = submit(db)[0]
+    for _ in range(MAX_ATTEMPTS):
+        make_due(db)
+        job = run_attempt(db, {})[0]
+    db.refresh(response)
+    assert job.status == "failed"
+    assert response.analysis_status == "failed" and response.sentiment is None
+
+
+def test_stale_running_jobs_are_requeued_or_failed(db):
+    retry, exhausted = submit(db, 2)
+    claim_jobs(db)
+    db.query(AnalysisJob).filter(AnalysisJob.response_id == exhausted.id).update({"attempts": MAX_ATTEMPTS})
+    # Last, since updated_at has an onupdate default
+    db.query(AnalysisJob).update({"updated_at": datetime.utcnow() - timedelta(minutes=STALE_JOB_MINUTES + 1)})
+    db.commit()
+
+    assert requeue_stale_jobs(db) == 2
+    jobs = {job.response_id: job for job in db.query(AnalysisJob)}
+    db.refresh(exhausted)
+    assert jobs[retry.id].status == "pending" and jobs[retry.id].available_at is None
+    assert jobs[exhausted.id].status == "failed"
+    assert exhausted.analysis_status == "failed"
+
+
+def test_recently_claimed_jobs_are_not_requeued(db):
+    submit(db)
+    claim_jobs(db)
+    assert requeue_stale_jobs(db) == 0
+    assert db.query(AnalysisJob.status).scalar() == "running"
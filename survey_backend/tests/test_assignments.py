@@ -0,0 +1,53 @@
+from assignments import resolve_target_users, sync_assignments
+from models import SurveyAssignment
+from conftest import add_survey, add_users
+
+
+def assigned(db, survey_id: int) -> set:
+    return {user_id for (user_id,) in db.query(SurveyAssignment.user_id).filter(SurveyAssignment.survey_id == survey_id)}
+
+
+def test_sync_writes_only_the_difference(db):
+    survey = add_survey(db)
+    a, b, c, d = [user.id for user in add_users(db, 4)]
+
+    assert sync_assignments(db, survey.id, {a, b, c}) == {"added": 3, "removed": 0, "unchanged": 0}
+    db.commit()
+    assert sync_assignments(db, survey.id, {b, c, d}) == {"added": 1, "removed": 1, "unchanged": 2}
+    db.commit()
+    assert assigned(db, survey.id) == {b, c, d}
+    assert sync_assignments(db, survey.id, {b, c, d}) == {"added": 0, "removed": 0, "unchanged": 3}
+
+
+def test_sync_leaves_other_surveys_alone(db):
+    first, second = add_survey(db, "First"), add_survey(db, "Second")
+    a, b = [user.id for user in add_users(db, 2)]
+    sync_assignments(db, first.id, {a, b})
+    sync_assignments(db, second.id, {a})
+    db.commit()
+
+    sync_assignments(db, first.id, set())
+    db.commit()
+    assert assigned(db, first.id) == set()
+    assert assigned(db, second.id) == {a}
+
+
+def test_resolve_targets_by_id_and_case_insensitive_role(db):
+    employees = [user.id for user in add_users(db, 3)]
+    managers = [user.id for user in add_users(db, 2, role="Manager", prefix="manager")]
+
+    valid, invalid = resolve_target_users(db, [employees[0], employees[0], 12345], ["MANAGER"])
+    assert valid == {employees[0], *managers}
+    assert invalid == [12345]
+
+
+def test_assign_endpoint_reports_changes(api, admin_headers):
+    api.post("/users/", json={"username": "emp", "password": "secret123", "role": "employee"})
+    survey_id = api.post("/surveys/", json={"title": "Pulse", "questions": ["How are you?"]},
+                         headers=admin_headers).json()["id"]
+    body = {"survey_id": survey_id, "roles": ["employee"], "user_ids": [999]}
+
+    first = api.post("/survey-assignments/", json=body, headers=admin_headers).json()
+    assert (first["added"], first["removed"], first["invalid_user_ids"]) == (1, 0, [999])
+    again = api.post("/survey-assignments/", json=body, headers=admin_headers).json()
+    assert (again["added"], again["unchanged"]) == (0, 1)
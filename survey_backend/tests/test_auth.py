@@ -0,0 +1,54 @@
+import jwt
+from main import SECRET_KEY, ALGORITHM, create_access_token
+
+
+def login(api, username: str, password: str) -> dict:
+    token = api.post("/token", data={"username": username, "password": password}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def claims(headers: dict) -> dict:
+    return jwt.decode(headers["Authorization"].split()[1], SECRET_KEY, algorithms=[ALGORITHM])
+
+
+def test_token_carries_identity_claims(api, admin_headers):
+    token_claims = claims(admin_headers)
+    assert token_claims["sub"] == "admin" and token_claims["role"] == "admin"
+    assert isinstance(token_claims["uid"], int) and token_claims["ver"] == 0
+    assert api.get("/users/me", headers=admin_headers).json() == {"username": "admin", "role": "admin"}
+
+
+def test_claims_alone_authorize_without_a_user_row(api):
+    token = create_access_token({"sub": "ghost", "uid": 999, "role": "employee", "ver": 0})
+    assert api.get("/users/me", headers={"Authorization": f"Bearer {token}"}).json()["username"] == "ghost"
+
+
+def test_tokens_missing_claims_or_signed_elsewhere_are_rejected(api):
+    missing_uid = create_access_token({"sub": "admin", "role": "admin"})
+    forged = jwt.encode({"sub": "admin", "uid": 1, "role": "admin"}, "not-the-secret", algorithm=ALGORITHM)
+    for token in (missing_uid, forged):
+        assert api.get("/users/me", headers={"Authorization": f"Bearer {token}"}).status_code == 401
+
+
+def test_wrong_password_is_rejected(api, admin_headers):
+    response = api.post("/token", data={"username": "admin", "password": "wrong-password"})
+    assert response.status_code == 400
+
+
+def test_revoking_tokens_invalidates_earlier_ones_only(api, admin_headers):
+    api.post("/users/", json={"username": "emp", "password": "secret123", "role": "employee"})
+    old = login(api, "emp", "secret123")
+    user_id = claims(old)["uid"]
+
+    assert api.post(f"/users/{user_id}/revoke-tokens", headers=admin_headers).status_code == 200
+    assert api.get("/users/me", headers=old).status_code == 401
+    assert api.get("/users/me", headers=login(api, "emp", "secret123")).status_code == 200
+    assert api.get("/users/me", headers=admin_headers).status_code == 200
+
+
+def test_employees_cannot_revoke_other_users(api, admin_headers):
+    api.post("/users/", json={"username": "emp", "password": "secret123", "role": "employee"})
+    admin_id = claims(admin_headers)["uid"]
+    response = api.post(f"/users/{admin_id}/revoke-tokens", headers=login(api, "emp", "secret123"))
+    assert response.status_code == 403
+    assert api.get("/users/me", headers=admin_headers).status_code == 200
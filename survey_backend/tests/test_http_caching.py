@@ -0,0 +1,74 @@
+import pytest
+from fastapi import HTTPException
+from pagination import encode_cursor, decode_cursor, NEXT_CURSOR_HEADER
+
+
+def create_surveys(api, headers, count: int) -> list:
+    return [
+        api.post("/surveys/", json={"title": f"Survey {i}", "questions": ["Q?"]}, headers=headers).json()["id"]
+        for i in range(count)
+    ]
+
+
+def test_cursor_round_trip_and_rejects_garbage():
+    assert decode_cursor(encode_cursor(12345)) == 12345
+    assert decode_cursor(None) == 0
+    with pytest.raises(HTTPException) as error:
+        decode_cursor("not a cursor!")
+    assert error.value.status_code == 400
+
+
+def test_keyset_pages_cover_every_survey_once(api, admin_headers):
+    ids = create_surveys(api, admin_headers, 5)
+    seen, cursor, pages = [], None, 0
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        response = api.get("/surveys/", params=params, headers=admin_headers)
+        seen += [survey["id"] for survey in response.json()]
+        pages += 1
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if not cursor:
+            break
+    assert seen == ids and pages == 3
+
+
+def test_cursor_ignores_rows_added_before_it(api, admin_headers):
+    ids = create_surveys(api, admin_headers, 3)
+    cursor = api.get("/surveys/", params={"limit": 2}, headers=admin_headers).headers[NEXT_CURSOR_HEADER]
+    newer = create_surveys(api, admin_headers, 1)
+    rest = api.get("/surveys/", params={"limit": 2, "cursor": cursor}, headers=admin_headers).json()
+    assert [survey["id"] for survey in rest] == ids[2:] + newer
+
+
+def test_sparse_fields_and_invalid_cursor(api, admin_headers):
+    create_surveys(api, admin_headers, 1)
+    assert list(api.get("/surveys/?fields=title", headers=admin_headers).json()[0]) == ["id", "title"]
+    assert api.get("/surveys/?fields=secret", headers=admin_headers).status_code == 400
+    assert api.get("/surveys/?cursor=@@@", headers=admin_headers).status_code == 400
+
+
+def test_survey_list_answers_304_until_a_survey_changes(api, admin_headers):
+    create_surveys(api, admin_headers, 1)
+    first = api.get("/surveys/", headers=admin_headers)
+    etag = first.headers["ETag"]
+
+    cached = api.get("/surveys/", headers={**admin_headers, "If-None-Match": etag})
+    assert cached.status_code == 304 and cached.headers["ETag"] == etag and not cached.content
+    # The query string is part of the tag
+    assert api.get("/surveys/?limit=1", headers={**admin_headers, "If-None-Match": etag}).status_code == 200
+
+    create_surveys(api, admin_headers, 1)
+    changed = api.get("/surveys/", headers={**admin_headers, "If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["ETag"] != etag
+
+
+def test_distribution_etag_follows_the_survey_data_version(api, admin_headers):
+    api.post("/users/", json={"username": "emp", "password": "secret123", "role": "employee"})
+    survey_id = create_surveys(api, admin_headers, 1)[0]
+    url = f"/analysis/survey/{survey_id}/distribution"
+    etag = api.get(url, headers=admin_headers).headers["ETag"]
+
+    assert api.get(url, headers={**admin_headers, "If-None-Match": f"{etag}, W/\"other\""}).status_code == 304
+    api.post("/survey-assignments/", json={"survey_id": survey_id, "roles": ["employee"]}, headers=admin_headers)
+    assert api.get(url, headers={**admin_headers, "If-None-Match": etag}).status_code == 200
+    assert api.get(f"/analysis/survey/{survey_id + 100}/distribution", headers=admin_headers).status_code == 404
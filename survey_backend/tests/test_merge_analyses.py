@@ -0,0 +1,45 @@
+from perplexityai_analysis import merge_analyses, extract_labels, normalize_label, ANALYSIS_FALLBACK
+
+
+def test_tone_is_a_weighted_vote():
+    merged = merge_analyses(
+        [{"emotional_tone": "Positive"}, {"emotional_tone": "Negative"}, {"emotional_tone": "Positive"}],
+        [1, 5, 1],
+    )
+    assert merged["emotional_tone"] == "Negative"
+
+
+def test_labels_are_compared_case_insensitively():
+    merged = merge_analyses(
+        [
+            {"emotional_tone": "negative", "burnout_risk": "high", "stress_level": "medium"},
+            {"emotional_tone": "Negative", "burnout_risk": "Low", "stress_level": " LOW "},
+            {"emotional_tone": "positive", "burnout_risk": "low", "stress_level": "low"},
+        ],
+        [1, 1, 1.5],
+    )
+    assert (merged["emotional_tone"], merged["burnout_risk"], merged["stress_level"]) == ("Negative", "High", "Medium")
+
+
+def test_score_is_the_weighted_mean_of_usable_scores():
+    merged = merge_analyses(
+        [{"sentiment_score": -1.0}, {"sentiment_score": 0.5}, {"sentiment_score": "n/a"}],
+        [3, 1, 10],
+    )
+    assert merged["sentiment_score"] == -0.62
+
+
+def test_missing_levels_and_concerns():
+    merged = merge_analyses(
+        [{"burnout_risk": "extreme", "key_concerns": ["workload", "pay", 3]}, {"key_concerns": ["workload", "hours"]}],
+        [1, 1],
+    )
+    assert (merged["emotional_tone"], merged["burnout_risk"], merged["stress_level"]) == ("Neutral", "Low", "Low")
+    assert merged["key_concerns"] == ["workload", "pay", "hours"]
+
+
+def test_extract_labels_stores_normalized_labels():
+    assert extract_labels({"analysis": {"emotional_tone": "negative", "burnout_risk": " high"}}) == ("Negative", "High")
+    assert extract_labels(dict(ANALYSIS_FALLBACK)) == ("Neutral", "Low")
+    assert extract_labels(None) == ("Neutral", "Low")
+    assert normalize_label("", "Low") == normalize_label(None, "Low") == "Low"
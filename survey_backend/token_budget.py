@@ -0,0 +1,89 @@
+"""
+Token budgets for LLM requests, estimated from characters: packed batches, chunked long feedback.
+"""
+import os
+import re
+import math
+
+# ==============================
+# CONFIGURATION
+# ==============================
+CHARS_PER_TOKEN = 4
+LLM_INPUT_TOKENS = int(os.getenv("LLM_INPUT_TOKENS", "1500"))
+LLM_MAX_CHUNKS = int(os.getenv("LLM_MAX_CHUNKS", "4"))
+LLM_OUTPUT_TOKENS_PER_ANALYSIS = int(os.getenv("LLM_OUTPUT_TOKENS_PER_ANALYSIS", "120"))
+
+# Compact reply keys and the analysis keys they stand for
+COMPACT_KEYS = {
+    "t": "emotional_tone",
+    "s": "stress_level",
+    "b": "burnout_risk",
+    "c": "key_concerns",
+    "v": "sentiment_score",
+}
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text or "") / CHARS_PER_TOKEN)
+
+
+def expand_analysis(entry: dict) -> dict:
+    """Map compact reply keys to the full analysis keys; full keys are kept as they are."""
+    return {COMPACT_KEYS.get(key, key): value for key, value in entry.items()}
+
+
+def _pieces(text: str, max_chars: int) -> list:
+    """Sentences, with any sentence longer than max_chars cut at word boundaries (or hard, for one huge word)."""
+    pieces = []
+    for sentence in _SENTENCE_END.split(text.strip()):
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            pieces.append(sentence[:cut])
+            sentence = sentence[cut:].lstrip()
+        if sentence:
+            pieces.append(sentence)
+    return pieces
+
+
+def split_to_budget(text: str, max_tokens: int = LLM_INPUT_TOKENS, max_chunks: int = LLM_MAX_CHUNKS) -> tuple:
+    """
+    Split text into chunks of at most max_tokens each. Returns (chunks, truncated),
+    where truncated is True when more than max_chunks were needed and the tail was dropped.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return [text], False
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    chunks, current = [], ""
+    for piece in _pieces(text, max_chars):
+        if current and len(current) + 1 + len(piece) > max_chars:
+            chunks.append(current)
+            current = piece
+        else:
+            current = f"{current} {piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks[:max_chunks], len(chunks) > max_chunks
+
+
+def pack_batches(items: list, max_items: int, max_tokens: int = LLM_INPUT_TOKENS) -> list:
+    """
+    Group (id, text) items, in order, into batches of at most max_items whose texts
+    together fit max_tokens. Items over the budget on their own get a batch of one.
+    """
+    batches, current, current_tokens = [], [], 0
+    for item in items:
+        tokens = estimate_tokens(item[1])
+        if tokens > max_tokens:
+            batches.append([item])
+            continue
+        if current and (len(current) >= max_items or current_tokens + tokens > max_tokens):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(item)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches